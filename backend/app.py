@@ -1,13 +1,28 @@
-from flask import Flask, request, jsonify
+from flask import Flask, Response, request, jsonify, make_response
+from flask.json.provider import DefaultJSONProvider
 from flask_cors import CORS
 import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 import google.generativeai as genai
 import os
 import logging
 from dotenv import load_dotenv
-from datetime import datetime, timedelta
-from collections import defaultdict
+from datetime import datetime, timedelta, timezone
+from collections import OrderedDict, defaultdict
+from concurrent.futures import Future, ThreadPoolExecutor
+from functools import cache, lru_cache
+from heapq import nlargest, nsmallest
+from operator import itemgetter, mul
+import hashlib
 import json
+import queue
+import random
+import re
+import string
+import threading
+import unicodedata
+import time
 
 # Suppress gRPC ALTS warnings
 os.environ['GRPC_VERBOSITY'] = 'ERROR'
@@ -41,7 +56,8 @@ try:
         get_rag_service, RAGService, classify_financial_query, 
         format_temporal_filter_human, embed_conversation_message,
         retrieve_conversation_context, format_time_ago,
-        classify_query_intent_with_llm, classify_query_unified_llm
+        classify_query_intent_with_llm, classify_query_unified_llm,
+        SemanticCache
     )
     RAG_AVAILABLE = True
 except ImportError:
@@ -58,6 +74,31 @@ except ImportError:
     print("Warning: User profile service not available.")
 
 
+# Use orjson for JSON responses when installed
+try:
+    import orjson
+    ORJSON_AVAILABLE = True
+except ImportError:
+    ORJSON_AVAILABLE = False
+    print("Warning: orjson not available. JSON responses will use the standard json module.")
+
+# Compress JSON responses when flask-compress is installed
+try:
+    from flask_compress import Compress
+    COMPRESS_AVAILABLE = True
+except ImportError:
+    COMPRESS_AVAILABLE = False
+    print("Warning: flask-compress not available. Responses will be sent uncompressed.")
+
+# Use Redis for the exact-match response cache when installed
+try:
+    import redis
+    REDIS_AVAILABLE = True
+except ImportError:
+    REDIS_AVAILABLE = False
+    print("Warning: redis not available. Response cache will be kept in process memory.")
+
+
 # Configure logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
@@ -65,18 +106,74 @@ logger = logging.getLogger(__name__)
 # Load environment variables
 load_dotenv()
 
+class OrJSONProvider(DefaultJSONProvider):
+    """Flask JSON provider backed by orjson.
+    
+    Dates still go through Flask's default handler so the output matches jsonify.
+    """
+    
+    def dumps(self, obj, **kwargs):
+        return self.dumps_bytes(obj, **kwargs).decode()
+    
+    def dumps_bytes(self, obj, **kwargs):
+        option = orjson.OPT_NON_STR_KEYS | orjson.OPT_PASSTHROUGH_DATETIME
+        if kwargs.get('sort_keys', self.sort_keys):
+            option |= orjson.OPT_SORT_KEYS
+        if kwargs.get('indent'):
+            option |= orjson.OPT_INDENT_2
+        return orjson.dumps(obj, default=kwargs.get('default', self.default), option=option)
+    
+    def loads(self, s, **kwargs):
+        return orjson.loads(s)
+    
+    def response(self, *args, **kwargs):
+        """Like jsonify, but hands orjson's bytes to the response without a str round-trip"""
+        obj = self._prepare_response_obj(args, kwargs)
+        indent = (self.compact is None and self._app.debug) or self.compact is False
+        return self._app.response_class(self.dumps_bytes(obj, indent=indent) + b'\n', mimetype=self.mimetype)
+
 app = Flask(__name__)
+if ORJSON_AVAILABLE:
+    app.json = OrJSONProvider(app)
 CORS(app)
 
+if COMPRESS_AVAILABLE:
+    app.config['COMPRESS_ALGORITHM'] = ['br', 'gzip']
+    app.config['COMPRESS_MIN_SIZE'] = 256
+    # Leave SSE chat streams alone so chunks are flushed as they are generated
+    app.config['COMPRESS_STREAMS'] = False
+    Compress(app)
+
 # ========== Chat History Database ==========
 import sqlite3
 import uuid
 
 DB_PATH = os.path.join(os.path.dirname(__file__), 'secretary.db')
 
+# Per-connection settings, defined once alongside the profile service's connections
+from user_profile import SQLITE_PRAGMAS
+
+def get_db_connection():
+    """Open a connection to the app database with the tuned PRAGMAs applied"""
+    conn = sqlite3.connect(DB_PATH)
+    for pragma in SQLITE_PRAGMAS:
+        conn.execute(pragma)
+    return conn
+
+# Bump whenever initialize_database() changes the schema
+SCHEMA_VERSION = 3
+
 def initialize_database():
     """Create conversations, messages, and user profile tables"""
-    conn = sqlite3.connect(DB_PATH)
+    conn = get_db_connection()
+    
+    # Every worker runs this on import; skip the DDL once the schema is current
+    if conn.execute('PRAGMA user_version').fetchone()[0] == SCHEMA_VERSION:
+        conn.close()
+        return
+    
+    # WAL lets chat-history reads proceed while another worker is writing
+    conn.execute('PRAGMA journal_mode=WAL')
     cursor = conn.cursor()
     
     cursor.execute('''
@@ -86,10 +183,19 @@ def initialize_database():
             created_at TIMESTAMP,
             updated_at TIMESTAMP,
             title TEXT,
-            message_count INTEGER DEFAULT 0
+            message_count INTEGER DEFAULT 0,
+            last_msg_at TIMESTAMP,
+            last_msg_preview TEXT
         )
     ''')
     
+    # Add the denormalized last-message columns to databases created before them
+    conversation_columns = {row[1] for row in cursor.execute('PRAGMA table_info(conversations)')}
+    if 'last_msg_at' not in conversation_columns:
+        cursor.execute('ALTER TABLE conversations ADD COLUMN last_msg_at TIMESTAMP')
+        cursor.execute('ALTER TABLE conversations ADD COLUMN last_msg_preview TEXT')
+        cursor.execute('UPDATE conversations SET last_msg_at = updated_at')
+    
     cursor.execute('''
         CREATE TABLE IF NOT EXISTS messages (
             id TEXT PRIMARY KEY,
@@ -102,9 +208,115 @@ def initialize_database():
         )
     ''')
     
+    # Older databases have this index ascending; rebuild it once as DESC
+    cursor.execute("SELECT sql FROM sqlite_master WHERE type = 'index' AND name = 'idx_conversation_messages'")
+    row = cursor.fetchone()
+    if row and 'DESC' not in row[0]:
+        cursor.execute('DROP INDEX idx_conversation_messages')
+    
     cursor.execute('''
         CREATE INDEX IF NOT EXISTS idx_conversation_messages 
-        ON messages(conversation_id, timestamp)
+        ON messages(conversation_id, timestamp DESC)
+    ''')
+    
+    cursor.execute('''
+        CREATE INDEX IF NOT EXISTS idx_messages_conv_role_ts 
+        ON messages(conversation_id, role, timestamp DESC)
+    ''')
+    
+    cursor.execute('''
+        CREATE INDEX IF NOT EXISTS idx_conv_user_recent 
+        ON conversations(user_id, last_msg_at DESC)
+    ''')
+    
+    # Keep the conversation row's activity fields current as messages arrive,
+    # so listing recent conversations never joins or aggregates messages
+    cursor.execute('''
+        CREATE TRIGGER IF NOT EXISTS trg_msg_touch AFTER INSERT ON messages
+        BEGIN
+            UPDATE conversations
+            SET last_msg_at = NEW.timestamp,
+                last_msg_preview = substr(NEW.content, 1, 200),
+                message_count = message_count + 1,
+                updated_at = NEW.timestamp
+            WHERE id = NEW.conversation_id;
+        END
+    ''')
+    
+    # State shared by every worker process and kept across restarts
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS plaid_tokens (
+            user_id TEXT PRIMARY KEY,
+            access_token TEXT,
+            item_id TEXT,
+            cursor TEXT,
+            updated_at TIMESTAMP,
+            last_sync_at REAL DEFAULT 0
+        )
+    ''')
+    
+    token_columns = {row[1] for row in cursor.execute('PRAGMA table_info(plaid_tokens)')}
+    if 'last_sync_at' not in token_columns:
+        cursor.execute('ALTER TABLE plaid_tokens ADD COLUMN last_sync_at REAL DEFAULT 0')
+    
+    # Transactions applied from transactions/sync, served newest first by /api/plaid/transactions
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS plaid_transactions (
+            transaction_id TEXT PRIMARY KEY,
+            account_id TEXT,
+            date TEXT,
+            name TEXT,
+            merchant_name TEXT,
+            amount REAL,
+            category_json TEXT,
+            category_id TEXT,
+            pending INTEGER,
+            payment_channel TEXT,
+            location_json TEXT
+        )
+    ''')
+    
+    cursor.execute('''
+        CREATE INDEX IF NOT EXISTS idx_plaid_transactions_date 
+        ON plaid_transactions(date DESC)
+    ''')
+    
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS transaction_overrides (
+            transaction_id TEXT PRIMARY KEY,
+            updates_json TEXT,
+            updated_at REAL,
+            deleted INTEGER DEFAULT 0
+        )
+    ''')
+    
+    override_columns = {row[1] for row in cursor.execute('PRAGMA table_info(transaction_overrides)')}
+    if 'deleted' not in override_columns:
+        cursor.execute('ALTER TABLE transaction_overrides ADD COLUMN deleted INTEGER DEFAULT 0')
+        cursor.execute("UPDATE transaction_overrides SET deleted = 1 WHERE json_extract(updates_json, '$.deleted')")
+    
+    # Covers the deleted-id lookup so it never touches the override JSON
+    cursor.execute('''
+        CREATE INDEX IF NOT EXISTS idx_overrides_deleted 
+        ON transaction_overrides(deleted, transaction_id)
+    ''')
+    
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS generated_txn_cache (
+            days_key INTEGER PRIMARY KEY,
+            data_json TEXT,
+            created_at TIMESTAMP
+        )
+    ''')
+    
+    # Exact-match cache of LLM responses for endpoints with categorical inputs
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS llm_response_cache (
+            key TEXT PRIMARY KEY,
+            response_json TEXT,
+            created_at REAL,
+            expires_at REAL
+        )
     ''')
     
     # ========== User Profile Tables ==========
@@ -192,10 +404,33 @@ def initialize_database():
         VALUES ('default_user', 'User', 'user@example.com', FALSE)
     ''')
     
+    cursor.execute(f'PRAGMA user_version={SCHEMA_VERSION}')
     conn.commit()
+    conn.execute('PRAGMA optimize')
     conn.close()
     logger.info("Database initialized successfully")
 
+def llm_cache_get(key):
+    """Return the cached response JSON text for key, or None if missing or expired"""
+    conn = get_db_connection()
+    row = conn.execute(
+        'SELECT response_json FROM llm_response_cache WHERE key = ? AND expires_at > ?',
+        (key, time.time())
+    ).fetchone()
+    conn.close()
+    return row[0] if row else None
+
+def llm_cache_put(key, response_json, ttl):
+    """Store response JSON text under key for ttl seconds"""
+    now = time.time()
+    conn = get_db_connection()
+    conn.execute(
+        'INSERT OR REPLACE INTO llm_response_cache (key, response_json, created_at, expires_at) VALUES (?, ?, ?, ?)',
+        (key, response_json, now, now + ttl)
+    )
+    conn.commit()
+    conn.close()
+
 # Initialize database on startup
 initialize_database()
 # ========== End Chat History Database ==========
@@ -203,10 +438,108 @@ initialize_database()
 # Request logging middleware
 @app.before_request
 def log_request():
-    logger.info(f'{request.method} {request.path}')
+    logger.info('%s %s', request.method, request.path)
+
+# Configure Gemini API. The gRPC transport keeps one persistent, multiplexed HTTP/2
+# channel per client, and genai reuses that client for every model and request.
+GEMINI_TRANSPORT = os.getenv('GEMINI_TRANSPORT', 'grpc')
+genai.configure(api_key=os.getenv('GEMINI_API_KEY'), transport=GEMINI_TRANSPORT)
+
+# ``` or ```json fence wrapped around the whole model output (an unclosed fence runs to the end)
+CODE_FENCE_RE = re.compile(r'\s*```(?:json)?\s*(.*?)\s*(?:```)?\s*\Z', re.DOTALL)
+
+# Outermost {...} span, for replies that wrap the JSON in prose
+JSON_OBJECT_RE = re.compile(r'\{.*\}', re.DOTALL)
 
-# Configure Gemini API
-genai.configure(api_key=os.getenv('GEMINI_API_KEY'))
+def strip_code_fence(text):
+    """Return the contents of a markdown code fence wrapping a model response, or the stripped text.
+    
+    Only a fence at the very start counts, so backticks inside unfenced JSON values are left alone.
+    """
+    match = CODE_FENCE_RE.match(text)
+    return match.group(1) if match else text.strip()
+
+# Semantic cache for repeated or paraphrased LLM prompts (needs the RAG embedding model)
+SEMANTIC_CACHE_ENABLED = os.getenv('SEMANTIC_CACHE_ENABLED', 'false').lower() == 'true'
+SEMANTIC_CACHE_THRESHOLD = float(os.getenv('SEMANTIC_CACHE_THRESHOLD', '0.92'))
+_semantic_cache = None
+
+def get_semantic_cache():
+    """Return the shared semantic cache, or None when disabled or embeddings are unavailable"""
+    global _semantic_cache
+    if not SEMANTIC_CACHE_ENABLED or not RAG_AVAILABLE:
+        return None
+    if _semantic_cache is None:
+        rag_svc = get_rag_service()
+        if not rag_svc.enabled:
+            return None
+        _semantic_cache = SemanticCache(rag_svc, threshold=SEMANTIC_CACHE_THRESHOLD)
+    return _semantic_cache
+
+# Exact-match cache for identical prompts, shared through Redis when REDIS_URL is set
+CHAT_CACHE_TTL = 4 * 60 * 60
+INSIGHT_CACHE_TTL = 60 * 60
+WIDGET_CACHE_TTL = 10 * 60
+EXACT_CACHE_MAX_ENTRIES = 2000
+REDIS_URL = os.getenv('REDIS_URL')
+redis_client = redis.Redis.from_url(REDIS_URL) if REDIS_AVAILABLE and REDIS_URL else None
+_EXACT_CACHE = {}  # key -> (expires_at, value), used when Redis is not configured
+_EXACT_CACHE_LOCK = threading.Lock()
+_EXACT_CACHE_STATS = {'hits': 0, 'misses': 0}
+
+def _exact_cache_key(text):
+    return 'llm:' + hashlib.sha256(text.encode()).hexdigest()
+
+def exact_cache_get(text):
+    """Return the cached response for this exact prompt text, or None"""
+    key = _exact_cache_key(text)
+    value = None
+    if redis_client is not None:
+        try:
+            raw = redis_client.get(key)
+            value = raw.decode() if raw is not None else None
+        except redis.RedisError as e:
+            logger.warning("Redis cache lookup failed: %s", e)
+        with _EXACT_CACHE_LOCK:
+            _EXACT_CACHE_STATS['hits' if value is not None else 'misses'] += 1
+    else:
+        with _EXACT_CACHE_LOCK:
+            entry = _EXACT_CACHE.get(key)
+            if entry is not None:
+                if entry[0] > time.time():
+                    value = entry[1]
+                else:
+                    del _EXACT_CACHE[key]
+            _EXACT_CACHE_STATS['hits' if value is not None else 'misses'] += 1
+    return value
+
+def exact_cache_set(text, value, ttl):
+    """Cache a response for this exact prompt text for ttl seconds"""
+    key = _exact_cache_key(text)
+    if redis_client is not None:
+        try:
+            redis_client.setex(key, ttl, value)
+        except redis.RedisError as e:
+            logger.warning("Redis cache write failed: %s", e)
+        return
+    with _EXACT_CACHE_LOCK:
+        _EXACT_CACHE.pop(key, None)
+        _EXACT_CACHE[key] = (time.time() + ttl, value)
+        if len(_EXACT_CACHE) > EXACT_CACHE_MAX_ENTRIES:
+            del _EXACT_CACHE[next(iter(_EXACT_CACHE))]
+
+# Gemini calls are network-bound, so independent prompts are overlapped on a small pool
+LLM_MAX_WORKERS = int(os.getenv('LLM_MAX_WORKERS', '8'))
+_LLM_EXECUTOR = ThreadPoolExecutor(max_workers=LLM_MAX_WORKERS, thread_name_prefix='gemini')
+
+def generate_content_concurrently(model, prompts):
+    """Start generate_content for every prompt at once and return one Future per prompt"""
+    return [_LLM_EXECUTOR.submit(model.generate_content, prompt) for prompt in prompts]
+
+@lru_cache(maxsize=None)
+def get_gemini_model(model_name='gemini-2.5-flash'):
+    """Return a shared Gemini model, created on first use"""
+    return genai.GenerativeModel(model_name)
 
 # Configure Plaid API
 PLAID_CLIENT_ID = os.getenv('PLAID_CLIENT_ID')
@@ -228,19 +561,60 @@ plaid_configuration = plaid.Configuration(
         'secret': PLAID_SECRET,
     }
 )
+# The ApiClient keeps one urllib3 pool for its lifetime; size it for concurrent handlers
+plaid_configuration.connection_pool_maxsize = int(os.getenv('PLAID_POOL_MAXSIZE', '50'))
 api_client = plaid.ApiClient(plaid_configuration)
 plaid_client = plaid_api.PlaidApi(api_client)
 
-# In-memory storage for access tokens and cursors (use database in production)
-PLAID_ACCESS_TOKENS = {}
-PLAID_ITEM_IDS = {}
-PLAID_TRANSACTION_CURSORS = {}
-
-# Default sandbox access token (for demo purposes)
+# Default sandbox access token (for demo purposes); persisted in plaid_tokens
 DEFAULT_ACCESS_TOKEN = None
+_SANDBOX_TOKEN_LOCK = threading.Lock()
+
+def load_plaid_token(user_id):
+    """Return the stored (access_token, cursor) for user_id, or (None, '')"""
+    conn = get_db_connection()
+    row = conn.execute('SELECT access_token, cursor FROM plaid_tokens WHERE user_id = ?', (user_id,)).fetchone()
+    conn.close()
+    return (row[0], row[1] or '') if row else (None, '')
+
+def save_plaid_token(user_id, access_token, item_id):
+    """Store a new access token, starting its transactions/sync cursor from scratch"""
+    conn = get_db_connection()
+    with conn:
+        conn.execute('''
+            INSERT INTO plaid_tokens (user_id, access_token, item_id, cursor, updated_at, last_sync_at)
+            VALUES (?, ?, ?, '', ?, 0)
+            ON CONFLICT(user_id) DO UPDATE SET
+                access_token = excluded.access_token,
+                item_id = excluded.item_id,
+                cursor = '',
+                updated_at = excluded.updated_at,
+                last_sync_at = 0
+        ''', (user_id, access_token, item_id, datetime.now().isoformat()))
+        # Stored transactions belong to the previous item; the fresh cursor re-syncs them
+        if user_id == 'default':
+            conn.execute('DELETE FROM plaid_transactions')
+    conn.close()
+
+def save_plaid_cursor(user_id, cursor):
+    conn = get_db_connection()
+    with conn:
+        conn.execute(
+            'UPDATE plaid_tokens SET cursor = ?, updated_at = ? WHERE user_id = ?',
+            (cursor, datetime.now().isoformat(), user_id)
+        )
+    conn.close()
 
 SEARCHAPI_KEY = os.getenv('SEARCH_API_KEY') or os.getenv('SEARCHAPI_KEY') or os.getenv('SEARCH_APIIO_KEY')
 
+# Shared keep-alive session so repeat flight searches skip the TCP/TLS handshake
+SEARCHAPI_SESSION = requests.Session()
+SEARCHAPI_SESSION.mount('https://', HTTPAdapter(
+    pool_connections=10,
+    pool_maxsize=50,
+    max_retries=Retry(total=2, backoff_factor=0.2, status_forcelist=[502, 503, 504])
+))
+
 # Initialize AI agents if available
 if INVESTMENT_FEATURES_AVAILABLE:
     investment_agent = InvestmentAgent()
@@ -281,6 +655,16 @@ CITY_TO_IATA = {
     'taipei': 'TPE',
 }
 
+_CITY_PUNCTUATION = str.maketrans('', '', string.punctuation)
+
+@lru_cache(maxsize=1024)
+def _normalize_city(city):
+    """Lowercase, strip accents and punctuation so 'San Sebastián' and 'St. Augustine' match"""
+    folded = unicodedata.normalize('NFKD', city).encode('ascii', 'ignore').decode()
+    return ' '.join(folded.translate(_CITY_PUNCTUATION).lower().split())
+
+CITY_TO_IATA_NORMALIZED = {_normalize_city(city): code for city, code in CITY_TO_IATA.items()}
+
 # ========== Categories and Tags Management ==========
 CATEGORIES = [
     'Food & Drink',
@@ -307,8 +691,46 @@ TAGS = [
     'Tax Deductible'
 ]
 
-# In-memory storage for transaction updates (in production, use a database)
-TRANSACTION_UPDATES = {}
+# User edits and deletions are stored in transaction_overrides so every worker sees them
+
+def load_transaction_updates():
+    """Return ({transaction_id: updates} for edited transactions, set of deleted transaction ids).
+    
+    Deleted transactions are only ever skipped, so their ids come straight from
+    the deleted index and their override JSON is never decoded.
+    """
+    conn = get_db_connection()
+    deleted_ids = {row[0] for row in conn.execute('SELECT transaction_id FROM transaction_overrides WHERE deleted = 1')}
+    rows = conn.execute('SELECT transaction_id, updates_json FROM transaction_overrides WHERE deleted = 0').fetchall()
+    conn.close()
+    return {transaction_id: app.json.loads(updates_json) for transaction_id, updates_json in rows}, deleted_ids
+
+def save_transaction_update(transaction_id, updates):
+    """Merge updates into the stored overrides for a transaction"""
+    conn = get_db_connection()
+    with conn:
+        # Take the write lock before reading so concurrent merges don't drop fields
+        conn.execute('BEGIN IMMEDIATE')
+        row = conn.execute(
+            'SELECT updates_json FROM transaction_overrides WHERE transaction_id = ?', (transaction_id,)
+        ).fetchone()
+        merged = {**(app.json.loads(row[0]) if row else {}), **updates}
+        conn.execute('''
+            INSERT INTO transaction_overrides (transaction_id, updates_json, updated_at, deleted)
+            VALUES (?, ?, ?, ?)
+            ON CONFLICT(transaction_id) DO UPDATE SET
+                updates_json = excluded.updates_json,
+                updated_at = excluded.updated_at,
+                deleted = excluded.deleted
+        ''', (transaction_id, app.json.dumps(merged), time.time(), int(bool(merged.get('deleted')))))
+    conn.close()
+
+def transaction_updates_version():
+    """Changes whenever a transaction is edited or deleted, for revalidating cached responses"""
+    conn = get_db_connection()
+    row = conn.execute('SELECT COUNT(*), MAX(updated_at) FROM transaction_overrides').fetchone()
+    conn.close()
+    return row
 
 # In-memory cache for generated transactions (persists across requests)
 CACHED_TRANSACTIONS = {
@@ -316,6 +738,31 @@ CACHED_TRANSACTIONS = {
     'generated_for_days': None
 }
 
+@lru_cache(maxsize=2048)
+def _parse_ymd(date_str):
+    """Parse a 'YYYY-MM-DD' date string into a datetime.
+
+    Plaid and the mock generator always emit strict ISO dates, so slice the
+    fields directly instead of paying for strptime's format interpretation.
+    Anything else falls back to strptime (and raises the same errors).
+    """
+    if len(date_str) == 10 and date_str[4] == '-' and date_str[7] == '-':
+        try:
+            return datetime(int(date_str[0:4]), int(date_str[5:7]), int(date_str[8:10]))
+        except ValueError:
+            pass
+    return datetime.strptime(date_str, '%Y-%m-%d')
+
+@lru_cache(maxsize=2048)
+def _ymd_parts(date_str):
+    """Split a 'YYYY-MM-DD' string into (year, month, day) ints, or None if it isn't one"""
+    if len(date_str) >= 10 and date_str[4] == '-' and date_str[7] == '-':
+        try:
+            return int(date_str[0:4]), int(date_str[5:7]), int(date_str[8:10])
+        except ValueError:
+            pass
+    return None
+
 @app.route('/get-categories', methods=['GET'])
 def get_categories():
     return jsonify(CATEGORIES)
@@ -333,29 +780,51 @@ def get_or_create_sandbox_token():
     if DEFAULT_ACCESS_TOKEN:
         return DEFAULT_ACCESS_TOKEN
     
-    try:
-        # Create a sandbox public token
-        pt_request = SandboxPublicTokenCreateRequest(
-            institution_id='ins_109508',  # First Platypus Bank (sandbox institution)
-            initial_products=[Products('transactions'), Products('auth')]
-        )
-        pt_response = plaid_client.sandbox_public_token_create(pt_request)
-        public_token = pt_response['public_token']
-        
-        # Exchange for access token
-        exchange_request = ItemPublicTokenExchangeRequest(public_token=public_token)
-        exchange_response = plaid_client.item_public_token_exchange(exchange_request)
+    # One creator at a time; callers that arrive mid-creation (e.g. during the
+    # startup warm-up) wait for it and reuse the result
+    with _SANDBOX_TOKEN_LOCK:
+        if DEFAULT_ACCESS_TOKEN:
+            return DEFAULT_ACCESS_TOKEN
+        
+        # Reuse the token another worker (or a previous run) already created
+        stored_token, _ = load_plaid_token('default')
+        if stored_token:
+            DEFAULT_ACCESS_TOKEN = stored_token
+            return DEFAULT_ACCESS_TOKEN
         
-        DEFAULT_ACCESS_TOKEN = exchange_response['access_token']
-        PLAID_ACCESS_TOKENS['default'] = DEFAULT_ACCESS_TOKEN
-        PLAID_ITEM_IDS['default'] = exchange_response['item_id']
-        
-        logger.info(f"Created sandbox access token for item: {exchange_response['item_id']}")
-        return DEFAULT_ACCESS_TOKEN
-        
-    except plaid.ApiException as e:
-        logger.error(f"Plaid API error creating sandbox token: {e}")
-        raise e
+        try:
+            # Create a sandbox public token
+            pt_request = SandboxPublicTokenCreateRequest(
+                institution_id='ins_109508',  # First Platypus Bank (sandbox institution)
+                initial_products=[Products('transactions'), Products('auth')]
+            )
+            pt_response = plaid_client.sandbox_public_token_create(pt_request)
+            public_token = pt_response['public_token']
+            
+            # Exchange for access token
+            exchange_request = ItemPublicTokenExchangeRequest(public_token=public_token)
+            exchange_response = plaid_client.item_public_token_exchange(exchange_request)
+            
+            DEFAULT_ACCESS_TOKEN = exchange_response['access_token']
+            save_plaid_token('default', DEFAULT_ACCESS_TOKEN, exchange_response['item_id'])
+            
+            logger.info("Created sandbox access token for item: %s", exchange_response['item_id'])
+            return DEFAULT_ACCESS_TOKEN
+            
+        except plaid.ApiException as e:
+            logger.error("Plaid API error creating sandbox token: %s", e)
+            raise e
+
+def _warm_sandbox_token():
+    try:
+        get_or_create_sandbox_token()
+    except Exception as e:
+        logger.warning("Plaid sandbox token warm-up failed: %s", e)
+
+# Create the sandbox token in the background at startup so the first Plaid
+# request doesn't pay for the public-token create and exchange round trips
+if PLAID_ENV == 'sandbox' and PLAID_CLIENT_ID and PLAID_SECRET:
+    threading.Thread(target=_warm_sandbox_token, name='plaid-token-warmup', daemon=True).start()
 
 @app.route('/api/create_link_token', methods=['POST'])
 def create_link_token():
@@ -367,7 +836,7 @@ def create_link_token():
             country_codes=[CountryCode('US')],
             language='en',
             user=LinkTokenCreateRequestUser(
-                client_user_id='user-' + str(datetime.now().timestamp())
+                client_user_id='user-' + uuid.uuid4().hex
             )
         )
         response = plaid_client.link_token_create(request_data)
@@ -376,8 +845,8 @@ def create_link_token():
             'expiration': response['expiration']
         })
     except plaid.ApiException as e:
-        error_response = json.loads(e.body)
-        logger.error(f"Plaid API error: {error_response}")
+        error_response = app.json.loads(e.body)
+        logger.error("Plaid API error: %s", error_response)
         return jsonify({'error': error_response.get('error_message', 'Failed to create link token')}), 400
 
 @app.route('/api/exchange_public_token', methods=['POST'])
@@ -396,17 +865,18 @@ def exchange_public_token():
         access_token = exchange_response['access_token']
         item_id = exchange_response['item_id']
         
-        # Store the access token (in production, store securely in database)
-        PLAID_ACCESS_TOKENS[item_id] = access_token
-        PLAID_ITEM_IDS[item_id] = item_id
+        # Store the access token (in production, encrypt it at rest)
+        save_plaid_token(item_id, access_token, item_id)
+        
+        _invalidate_plaid_snapshot()
         
         return jsonify({
             'success': True,
             'item_id': item_id
         })
     except plaid.ApiException as e:
-        error_response = json.loads(e.body)
-        logger.error(f"Plaid API error: {error_response}")
+        error_response = app.json.loads(e.body)
+        logger.error("Plaid API error: %s", error_response)
         return jsonify({'error': error_response.get('error_message', 'Failed to exchange token')}), 400
 
 @app.route('/api/plaid/accounts', methods=['GET'])
@@ -441,76 +911,32 @@ def get_plaid_accounts():
             'item_id': balance_response['item']['item_id']
         })
     except plaid.ApiException as e:
-        error_response = json.loads(e.body)
-        logger.error(f"Plaid API error: {error_response}")
+        error_response = app.json.loads(e.body)
+        logger.error("Plaid API error: %s", error_response)
         return jsonify({'error': error_response.get('error_message', 'Failed to get accounts')}), 400
     except Exception as e:
-        logger.error(f"Error getting accounts: {e}")
+        logger.exception("Error getting accounts: %s", e)
         return jsonify({'error': str(e)}), 500
 
 @app.route('/api/plaid/transactions', methods=['GET'])
 def get_plaid_transactions():
-    """Get transactions using Plaid's transactions/sync endpoint with cursor-based pagination"""
+    """Get the newest transactions, syncing them from Plaid's transactions/sync endpoint at most once a minute"""
     try:
-        # Get or create sandbox access token for demo
-        access_token = get_or_create_sandbox_token()
+        sync_plaid_transactions_if_stale()
         
-        # Get cursor if it exists
-        cursor = PLAID_TRANSACTION_CURSORS.get('default', '')
-        
-        all_transactions = []
-        has_more = True
-        
-        while has_more:
-            sync_request = TransactionsSyncRequest(
-                access_token=access_token,
-                cursor=cursor if cursor else None
-            )
-            sync_response = plaid_client.transactions_sync(sync_request)
-            
-            # Process added transactions
-            for transaction in sync_response['added']:
-                all_transactions.append({
-                    'transaction_id': transaction['transaction_id'],
-                    'account_id': transaction['account_id'],
-                    'date': transaction['date'],
-                    'name': transaction['name'],
-                    'merchant_name': transaction.get('merchant_name'),
-                    'amount': transaction['amount'],  # Positive = expense, negative = income in Plaid
-                    'category': transaction.get('category', []),
-                    'category_id': transaction.get('category_id'),
-                    'pending': transaction['pending'],
-                    'payment_channel': transaction.get('payment_channel'),
-                    'location': {
-                        'city': transaction['location'].get('city') if transaction.get('location') else None,
-                        'region': transaction['location'].get('region') if transaction.get('location') else None,
-                    } if transaction.get('location') else None
-                })
-            
-            # Update cursor for next sync
-            cursor = sync_response['next_cursor']
-            has_more = sync_response['has_more']
-            
-            # Limit iterations for safety
-            if len(all_transactions) > 500:
-                break
-        
-        # Store cursor for future syncs
-        PLAID_TRANSACTION_CURSORS['default'] = cursor
-        
-        # Sort by date (newest first)
-        all_transactions.sort(key=lambda x: x['date'], reverse=True)
+        # Served newest first straight off the plaid_transactions date index
+        all_transactions = load_plaid_transactions()
         
         return jsonify({
             'transactions': all_transactions,
             'total_count': len(all_transactions)
         })
     except plaid.ApiException as e:
-        error_response = json.loads(e.body)
-        logger.error(f"Plaid API error: {error_response}")
+        error_response = app.json.loads(e.body)
+        logger.error("Plaid API error: %s", error_response)
         return jsonify({'error': error_response.get('error_message', 'Failed to get transactions')}), 400
     except Exception as e:
-        logger.error(f"Error getting transactions: {e}")
+        logger.exception("Error getting transactions: %s", e)
         return jsonify({'error': str(e)}), 500
 
 def transform_plaid_transaction_to_legacy(plaid_transaction):
@@ -546,9 +972,356 @@ def transform_plaid_account_to_legacy(plaid_account):
         'balance': plaid_account['balance']['current'] or 0
     }
 
+# Pages are cursor-chained, but the next request can be in flight while the
+# current page is transformed
+_PLAID_SYNC_EXECUTOR = ThreadPoolExecutor(max_workers=2, thread_name_prefix='plaid-sync')
+
+# Plaid's maximum page size; the default of 100 needs five times the round trips
+PLAID_SYNC_PAGE_SIZE = 500
+
+def _plaid_sync_page(access_token, cursor):
+    sync_request = TransactionsSyncRequest(
+        access_token=access_token,
+        cursor=cursor if cursor else None,
+        count=PLAID_SYNC_PAGE_SIZE
+    )
+    return plaid_client.transactions_sync(sync_request)
+
+def _plaid_sync_pages(access_token, cursor, max_fetch):
+    """Yield transactions/sync pages from cursor, requesting each next page while
+    the caller handles the current one.
+    
+    Stops after the page that takes the added and modified count past max_fetch,
+    for safety; the last page's next_cursor resumes from there.
+    """
+    sync_response = _plaid_sync_page(access_token, cursor)
+    fetched = 0
+    
+    while sync_response is not None:
+        fetched += len(sync_response['added']) + len(sync_response['modified'])
+        next_page = None
+        if sync_response['has_more'] and fetched <= max_fetch:
+            next_page = _PLAID_SYNC_EXECUTOR.submit(_plaid_sync_page, access_token, sync_response['next_cursor'])
+        
+        yield sync_response
+        sync_response = next_page.result() if next_page is not None else None
+
+def _retry_sync_on_mutation(fetch, access_token, cursor, *args):
+    """Run a transactions/sync pagination, restarting it once from cursor if Plaid
+    reports the item changed mid-pagination (TRANSACTIONS_SYNC_MUTATION_DURING_PAGINATION)
+    """
+    try:
+        return fetch(access_token, cursor, *args)
+    except plaid.ApiException as e:
+        if 'TRANSACTIONS_SYNC_MUTATION_DURING_PAGINATION' not in (e.body or ''):
+            raise
+        logger.info("Plaid transactions changed during pagination, restarting sync")
+        return fetch(access_token, cursor, *args)
+
+# ========== Stored Plaid Transactions ==========
+PLAID_TRANSACTIONS_SYNC_INTERVAL = 60  # seconds between transactions/sync calls
+PLAID_TRANSACTIONS_LIMIT = 500
+PLAID_TRANSACTIONS_MAX_FETCH = 2000  # transactions per sync before deferring to the next one
+
+_PLAID_TXN_SYNC_LOCK = threading.Lock()
+_PLAID_TXN_REQUIRED = itemgetter('transaction_id', 'account_id', 'date', 'name', 'amount', 'pending')
+_PLAID_TXN_COLUMNS = ('transaction_id, account_id, date, name, merchant_name, amount, '
+                      'category_json, category_id, pending, payment_channel, location_json')
+
+def _plaid_transaction_row(transaction):
+    """Flatten a Plaid transaction into a plaid_transactions row"""
+    transaction_id, account_id, date, name, amount, pending = _PLAID_TXN_REQUIRED(transaction)
+    get = transaction.get
+    location = get('location')
+    return (
+        transaction_id,
+        account_id,
+        str(date),
+        name,
+        get('merchant_name'),
+        amount,  # Positive = expense, negative = income in Plaid
+        app.json.dumps(get('category', [])),
+        get('category_id'),
+        int(pending),
+        get('payment_channel'),
+        app.json.dumps({
+            'city': location.get('city'),
+            'region': location.get('region'),
+        }) if location else None
+    )
+
+def _fetch_plaid_transaction_changes(access_token, cursor):
+    """Page through transactions/sync from cursor, returning (upsert rows, removed ids, next cursor)"""
+    upserts = []
+    removed = []
+    
+    for sync_response in _plaid_sync_pages(access_token, cursor, PLAID_TRANSACTIONS_MAX_FETCH):
+        cursor = sync_response['next_cursor']
+        
+        # Added and modified records both replace by id
+        upserts.extend(map(_plaid_transaction_row, sync_response['added'] + sync_response['modified']))
+        removed.extend((trans['transaction_id'],) for trans in sync_response['removed'])
+    
+    return upserts, removed, cursor
+
+def _sync_plaid_transactions():
+    """Apply transactions/sync changes since the stored cursor to plaid_transactions"""
+    access_token = get_or_create_sandbox_token()
+    _, cursor = load_plaid_token('default')
+    upserts, removed, cursor = _retry_sync_on_mutation(_fetch_plaid_transaction_changes, access_token, cursor)
+    
+    # Changes and the cursor that produced them commit together
+    conn = get_db_connection()
+    with conn:
+        conn.executemany(
+            f'INSERT OR REPLACE INTO plaid_transactions ({_PLAID_TXN_COLUMNS}) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)',
+            upserts
+        )
+        conn.executemany('DELETE FROM plaid_transactions WHERE transaction_id = ?', removed)
+        conn.execute(
+            'UPDATE plaid_tokens SET cursor = ?, last_sync_at = ?, updated_at = ? WHERE user_id = ?',
+            (cursor, time.time(), datetime.now().isoformat(), 'default')
+        )
+    conn.close()
+
+def sync_plaid_transactions_if_stale(max_age=PLAID_TRANSACTIONS_SYNC_INTERVAL):
+    """Sync plaid_transactions from Plaid unless that happened within the last max_age seconds"""
+    # Concurrent callers wait for one sync, then find it fresh
+    with _PLAID_TXN_SYNC_LOCK:
+        conn = get_db_connection()
+        row = conn.execute("SELECT last_sync_at FROM plaid_tokens WHERE user_id = 'default'").fetchone()
+        conn.close()
+        if row and time.time() - (row[0] or 0) < max_age:
+            return
+        _sync_plaid_transactions()
+
+def load_plaid_transactions(limit=PLAID_TRANSACTIONS_LIMIT):
+    """Return the newest stored Plaid transactions in the /api/plaid/transactions format"""
+    conn = get_db_connection()
+    rows = conn.execute(
+        f'SELECT {_PLAID_TXN_COLUMNS} FROM plaid_transactions ORDER BY date DESC LIMIT ?',
+        (limit,)
+    ).fetchall()
+    conn.close()
+    
+    loads = app.json.loads
+    return [{
+        'transaction_id': transaction_id,
+        'account_id': account_id,
+        'date': date,
+        'name': name,
+        'merchant_name': merchant_name,
+        'amount': amount,
+        'category': loads(category_json),
+        'category_id': category_id,
+        'pending': bool(pending),
+        'payment_channel': payment_channel,
+        'location': loads(location_json) if location_json else None
+    } for (transaction_id, account_id, date, name, merchant_name, amount,
+           category_json, category_id, pending, payment_channel, location_json) in rows]
+
+# ========== Plaid Snapshot Cache ==========
+# Accounts and transactions shared by the dashboard, transaction list, history,
+# monthly and recurring-expenses endpoints. transactions/sync only returns changes
+# since the stored cursor, so transactions are accumulated by id across refreshes.
+PLAID_SNAPSHOT_TTL = 60  # seconds
+PLAID_SNAPSHOT_MAX_FETCH = 2000  # transactions per refresh before deferring to the next one
+
+_PLAID_SNAPSHOT = {
+    'ts': 0.0,
+    'token': None,  # access token the cursor and transactions belong to
+    'cursor': '',
+    'accounts': [],
+    'transactions': {},
+    'refresh': None  # Future for the refresh in flight, shared by concurrent callers
+}
+_PLAID_SNAPSHOT_LOCK = threading.Lock()
+
+def _project_plaid_transaction(trans):
+    """Keep the Plaid transaction fields used by the dashboard endpoints"""
+    return {
+        'transaction_id': trans['transaction_id'],
+        'account_id': trans['account_id'],
+        'date': str(trans['date']),
+        'name': trans['name'],
+        'merchant_name': trans.get('merchant_name'),
+        'amount': trans['amount'],
+        'category': trans.get('category', []),
+        'pending': trans['pending']
+    }
+
+def _get_plaid_snapshot(ttl=PLAID_SNAPSHOT_TTL):
+    """Return (accounts, transactions) from Plaid, reusing a snapshot younger than ttl seconds.
+    
+    Accounts are in the legacy format. Transactions are projected Plaid records
+    shared with other requests, so callers must transform rather than mutate them.
+    A stale snapshot is returned immediately while it refreshes in the background;
+    without one, concurrent callers wait on a single refresh.
+    """
+    with _PLAID_SNAPSHOT_LOCK:
+        if time.time() - _PLAID_SNAPSHOT['ts'] < ttl:
+            return _PLAID_SNAPSHOT['accounts'], list(_PLAID_SNAPSHOT['transactions'].values())
+        
+        refresh = _PLAID_SNAPSHOT['refresh']
+        leader = refresh is None
+        if leader:
+            refresh = _PLAID_SNAPSHOT['refresh'] = Future()
+        
+        # A snapshot that was loaded once stays usable until the refresh lands
+        stale = None
+        if _PLAID_SNAPSHOT['ts'] > 0:
+            stale = _PLAID_SNAPSHOT['accounts'], list(_PLAID_SNAPSHOT['transactions'].values())
+    
+    if stale is not None:
+        if leader:
+            threading.Thread(target=_run_plaid_snapshot_refresh, args=(refresh,), daemon=True).start()
+        return stale
+    
+    if leader:
+        _run_plaid_snapshot_refresh(refresh)
+    
+    accounts, transactions = refresh.result()
+    return accounts, list(transactions.values())
+
+def _run_plaid_snapshot_refresh(refresh):
+    """Refresh the snapshot and publish the outcome on the shared refresh future"""
+    try:
+        refresh.set_result(_refresh_plaid_snapshot())
+    except BaseException as e:  # Waiters must never be left hanging
+        logger.warning("Plaid snapshot refresh failed: %s", e)
+        refresh.set_exception(e)
+    finally:
+        with _PLAID_SNAPSHOT_LOCK:
+            _PLAID_SNAPSHOT['refresh'] = None
+
+def _legacy_plaid_accounts(plaid_accounts):
+    """Transform Plaid accounts to the legacy format"""
+    return [transform_plaid_account_to_legacy({
+        'account_id': acc['account_id'],
+        'name': acc['name'],
+        'type': acc['type'],
+        'subtype': acc.get('subtype'),
+        'balance': {
+            'current': acc['balances'].get('current'),
+            'available': acc['balances'].get('available')
+        }
+    }) for acc in plaid_accounts]
+
+def _refresh_plaid_snapshot():
+    """Fetch accounts and sync transactions from Plaid into the shared snapshot"""
+    access_token = get_or_create_sandbox_token()
+    
+    # The cursor and accumulated transactions belong to one item; a new access
+    # token starts the sync over rather than applying changes to another item's data
+    if access_token == _PLAID_SNAPSHOT['token']:
+        cursor, transactions = _PLAID_SNAPSHOT['cursor'], _PLAID_SNAPSHOT['transactions']
+    else:
+        cursor, transactions = '', {}
+    
+    accounts, transactions, cursor = _retry_sync_on_mutation(
+        _fetch_plaid_snapshot_changes, access_token, cursor, transactions
+    )
+    
+    with _PLAID_SNAPSHOT_LOCK:
+        _PLAID_SNAPSHOT['token'] = access_token
+        _PLAID_SNAPSHOT['cursor'] = cursor
+        _PLAID_SNAPSHOT['accounts'] = accounts
+        _PLAID_SNAPSHOT['transactions'] = transactions
+        _PLAID_SNAPSHOT['ts'] = time.time()
+    
+    return accounts, transactions
+
+def _fetch_plaid_snapshot_changes(access_token, cursor, transactions):
+    """Page through transactions/sync from cursor, returning (accounts, merged transactions, next cursor)"""
+    # Apply changes since the last sync to a copy so readers never see a partial update
+    transactions = dict(transactions)
+    accounts = None
+    
+    for sync_response in _plaid_sync_pages(access_token, cursor, PLAID_SNAPSHOT_MAX_FETCH):
+        # Every sync page carries the item's accounts with their cached balances,
+        # so no separate /accounts/balance/get round trip is needed
+        if accounts is None:
+            accounts = _legacy_plaid_accounts(sync_response['accounts'])
+        cursor = sync_response['next_cursor']
+        
+        # Merge the page in bulk: added and modified records both replace by id
+        changed = sync_response['added'] + sync_response['modified']
+        transactions.update([(trans['transaction_id'], _project_plaid_transaction(trans)) for trans in changed])
+        for trans in sync_response['removed']:
+            transactions.pop(trans['transaction_id'], None)
+    
+    return accounts, transactions, cursor
+
+def _invalidate_plaid_snapshot():
+    """Force the next _get_plaid_snapshot call to refresh from Plaid"""
+    _PLAID_SNAPSHOT['ts'] = 0.0
+
+@app.route('/refresh-balances', methods=['POST'])
+def refresh_balances():
+    """Fetch real-time balances from the institution and update the snapshot's accounts.
+    
+    Snapshot refreshes use the balances cached with transactions/sync; this
+    slower call is for when the user explicitly asks for current figures.
+    """
+    try:
+        access_token = get_or_create_sandbox_token()
+        balance_request = AccountsBalanceGetRequest(access_token=access_token)
+        balance_response = plaid_client.accounts_balance_get(balance_request)
+        accounts = _legacy_plaid_accounts(balance_response['accounts'])
+        
+        with _PLAID_SNAPSHOT_LOCK:
+            if _PLAID_SNAPSHOT['token'] == access_token:
+                _PLAID_SNAPSHOT['accounts'] = accounts
+        
+        return jsonify({'accounts': accounts})
+    except plaid.ApiException as e:
+        error_response = app.json.loads(e.body)
+        logger.error("Plaid API error: %s", error_response)
+        return jsonify({'error': error_response.get('error_message', 'Failed to refresh balances')}), 400
+    except Exception as e:
+        logger.exception("Error refreshing balances: %s", e)
+        return jsonify({'error': str(e)}), 500
+
 # ========== Vacation & Flight Search Endpoints ==========
+VACATION_SUGGESTIONS_CACHE_TTL = 24 * 60 * 60
+
+VACATION_PRIORITY_DESCRIPTIONS = {
+    'adventure': 'outdoor activities, hiking, water sports, extreme sports, nature exploration',
+    'relaxation': 'beaches, spas, peaceful environments, scenic views, slow-paced activities',
+    'culture': 'museums, historical sites, local cuisine, cultural experiences, architecture',
+    'nightlife': 'bars, clubs, entertainment venues, dining scene, vibrant social atmosphere',
+    'balanced': 'a mix of activities including sightseeing, dining, some adventure, and relaxation'
+}
+
+VACATION_PROMPT = string.Template("""Based on the selected regions and vacation preferences, suggest 3 cities that best match the criteria.
+Return ONLY a valid JSON object with this exact structure:
+
+{
+  "suggestions": [
+    {
+      "city": "City Name",
+      "airport": "Full Airport Name",
+      "airport_code": "XXX",
+      "description": "2-3 sentence description highlighting why this city matches the preferences"
+    }
+  ]
+}
+
+Selected regions: $locations
+Vacation priority: $priority (focused on $priority_desc)
+
+Requirements:
+1. Choose cities ONLY from the selected regions
+2. Prioritize cities that strongly match the vacation priority
+3. Ensure cities have major international airports
+4. Provide diverse options (don't suggest cities too close to each other)
+5. Include the official IATA airport code
+6. Make descriptions specific to why each city matches the preferences
+
+Return ONLY the JSON object, no additional text.""")
+
 def _cheapest_flight_response(arrival: str, outbound_date: str, return_date: str):
-    logger.info(f'Flight search request: {arrival}, {outbound_date} to {return_date}')
+    logger.info('Flight search request: %s, %s to %s', arrival, outbound_date, return_date)
     
     if not SEARCHAPI_KEY:
         logger.error('Missing SEARCH_API_KEY')
@@ -560,10 +1333,9 @@ def _cheapest_flight_response(arrival: str, outbound_date: str, return_date: str
 
     url = 'https://www.searchapi.io/api/v1/search'
     
-    # Convert arrival to lowercase for case-insensitive lookup
-    arrival_lower = (arrival or '').strip().lower()
-    arrival_id = CITY_TO_IATA.get(arrival_lower, arrival)
-    logger.info(f'Using arrival airport code: {arrival_id} for {arrival}')
+    # Case-, accent- and punctuation-insensitive lookup
+    arrival_id = CITY_TO_IATA_NORMALIZED.get(_normalize_city(arrival), arrival)
+    logger.info('Using arrival airport code: %s for %s', arrival_id, arrival)
     
     params = {
         'engine': 'google_flights',
@@ -578,38 +1350,39 @@ def _cheapest_flight_response(arrival: str, outbound_date: str, return_date: str
     }
     
     try:
-        logger.info(f'Making request to SearchAPI with params: {params}')
-        r = requests.get(url, params=params, timeout=20)
-        logger.info(f'SearchAPI response status: {r.status_code}')
+        # Debug only, and without the API key
+        logger.debug('Making request to SearchAPI for %s (%s to %s)', arrival_id, outbound_date, return_date)
+        r = SEARCHAPI_SESSION.get(url, params=params, timeout=(3, 20))
+        logger.info('SearchAPI response status: %s', r.status_code)
         
         if r.status_code != 200:
-            logger.error(f'SearchAPI error: {r.status_code} - {r.text}')
+            logger.error('SearchAPI error: %s - %s', r.status_code, r.text)
             return jsonify({'error': 'searchapi error', 'status': r.status_code, 'details': r.text}), 502
         
-        data = r.json()
-        logger.info(f'SearchAPI returned data with keys: {list(data.keys())}')
+        # Decode the raw bytes with the app's (orjson) provider instead of requests' json
+        data = app.json.loads(r.content)
+        logger.debug('SearchAPI returned data with keys: %s', data.keys())
     except requests.Timeout:
         logger.error('Request timeout')
         return jsonify({'error': 'Request timeout'}), 504
     except requests.RequestException as e:
-        logger.error(f'Request failed: {str(e)}')
+        logger.error('Request failed: %s', e)
         return jsonify({'error': f'Request failed: {str(e)}'}), 502
     except Exception as e:
-        logger.error(f'Unexpected error: {str(e)}')
+        logger.error('Unexpected error: %s', e)
         return jsonify({'error': f'Unexpected error: {str(e)}'}), 500
 
     flights = data.get('cheapest_flights') or data.get('best_flights') or data.get('other_flights') or []
-    logger.info(f'Found {len(flights)} flights')
+    logger.info('Found %s flights', len(flights))
     
     if not flights:
         logger.warning('No flights found in response')
         return jsonify({'flights': [], 'price_insights': data.get('price_insights')}), 200
 
     priced = [f for f in flights if isinstance(f.get('price'), (int, float))]
-    flights_sorted = sorted(priced, key=lambda x: x.get('price')) if priced else flights
     
     # Return top 3 cheapest flights
-    top_flights = flights_sorted[:3]
+    top_flights = nsmallest(3, priced, key=itemgetter('price')) if priced else flights[:3]
     
     results = []
     for flight in top_flights:
@@ -651,7 +1424,7 @@ def get_cheapest_flight():
             request.args.get('return_date') or request.args.get('returnDate'),
         )
     except Exception as e:
-        logger.error(f'Error in get_cheapest_flight: {e}')
+        logger.exception('Error in get_cheapest_flight: %s', e)
         return jsonify({'error': str(e)}), 500
 
 @app.route('/get-cheapest-flight', methods=['GET'])
@@ -663,7 +1436,7 @@ def get_cheapest_flight_simple():
             request.args.get('return_date') or request.args.get('returnDate'),
         )
     except Exception as e:
-        logger.error(f'Error in get_cheapest_flight_simple: {e}')
+        logger.exception('Error in get_cheapest_flight_simple: %s', e)
         return jsonify({'error': str(e)}), 500
 
 @app.route('/get-vacation-suggestions', methods=['POST'])
@@ -676,63 +1449,30 @@ def get_vacation_suggestions():
         if not selected_locations:
             return jsonify({'error': 'No locations provided'}), 400
         
-        model = genai.GenerativeModel('gemini-2.5-flash')
-        
-        # Define priority descriptions
-        priority_descriptions = {
-            'adventure': 'outdoor activities, hiking, water sports, extreme sports, nature exploration',
-            'relaxation': 'beaches, spas, peaceful environments, scenic views, slow-paced activities',
-            'culture': 'museums, historical sites, local cuisine, cultural experiences, architecture',
-            'nightlife': 'bars, clubs, entertainment venues, dining scene, vibrant social atmosphere',
-            'balanced': 'a mix of activities including sightseeing, dining, some adventure, and relaxation'
-        }
-        
-        priority_desc = priority_descriptions.get(vacation_priority, 'various activities')
-        
-        prompt = f"""Based on the selected regions and vacation preferences, suggest 3 cities that best match the criteria.
-Return ONLY a valid JSON object with this exact structure:
-
-{{
-  "suggestions": [
-    {{
-      "city": "City Name",
-      "airport": "Full Airport Name",
-      "airport_code": "XXX",
-      "description": "2-3 sentence description highlighting why this city matches the preferences"
-    }}
-  ]
-}}
-
-Selected regions: {', '.join(selected_locations)}
-Vacation priority: {vacation_priority} (focused on {priority_desc})
-
-Requirements:
-1. Choose cities ONLY from the selected regions
-2. Prioritize cities that strongly match the vacation priority
-3. Ensure cities have major international airports
-4. Provide diverse options (don't suggest cities too close to each other)
-5. Include the official IATA airport code
-6. Make descriptions specific to why each city matches the preferences
-
-Return ONLY the JSON object, no additional text."""
+        # Inputs are categorical, so identical requests share one cached answer
+        cache_key = 'vacation:' + hashlib.sha256(app.json.dumps(
+            {'locs': sorted(selected_locations), 'prio': vacation_priority}, sort_keys=True
+        ).encode()).hexdigest()
+        cached = llm_cache_get(cache_key)
+        if cached is not None:
+            response = app.response_class(cached, mimetype=app.json.mimetype)
+            response.headers['X-Cache'] = 'HIT'
+            return response
+        
+        model = get_gemini_model()
+        
+        prompt = VACATION_PROMPT.substitute(
+            locations=', '.join(selected_locations),
+            priority=vacation_priority,
+            priority_desc=VACATION_PRIORITY_DESCRIPTIONS.get(vacation_priority, 'various activities')
+        )
         
         response = model.generate_content(prompt)
         
         try:
-            import json
-            
-            response_text = response.text.strip()
-            
             # Clean markdown code blocks
-            if response_text.startswith('```json'):
-                response_text = response_text[7:]
-            if response_text.startswith('```'):
-                response_text = response_text[3:]
-            if response_text.endswith('```'):
-                response_text = response_text[:-3]
-            
-            response_text = response_text.strip()
-            result = json.loads(response_text)
+            response_text = strip_code_fence(response.text)
+            result = app.json.loads(response_text)
             
             # Validate the structure
             if 'suggestions' not in result or not isinstance(result['suggestions'], list):
@@ -742,7 +1482,7 @@ Return ONLY the JSON object, no additional text."""
             if len(result['suggestions']) > 3:
                 result['suggestions'] = result['suggestions'][:3]
             elif len(result['suggestions']) < 3:
-                logger.warning(f'Only {len(result["suggestions"])} suggestions returned')
+                logger.warning('Only %s suggestions returned', len(result["suggestions"]))
             
             # Validate each suggestion has required fields
             for suggestion in result['suggestions']:
@@ -751,33 +1491,34 @@ Return ONLY the JSON object, no additional text."""
                     if field not in suggestion:
                         raise ValueError(f'Missing required field: {field}')
             
-            logger.info(f'Successfully generated {len(result["suggestions"])} vacation suggestions')
+            logger.info('Successfully generated %s vacation suggestions', len(result["suggestions"]))
+            llm_cache_put(cache_key, app.json.dumps(result), VACATION_SUGGESTIONS_CACHE_TTL)
             return jsonify(result)
             
         except json.JSONDecodeError as e:
-            logger.error(f"JSON decode error: {e}")
-            logger.error(f"Cleaned response text: {response_text}")
+            logger.error("JSON decode error: %s", e)
+            logger.error("Cleaned response text: %s", response_text)
             return jsonify({
                 'error': 'Failed to parse AI response',
                 'suggestions': []
             }), 500
         except ValueError as e:
-            logger.error(f"Validation error: {e}")
-            logger.error(f"Response text: {response_text}")
+            logger.error("Validation error: %s", e)
+            logger.error("Response text: %s", response_text)
             return jsonify({
                 'error': 'Invalid AI response structure',
                 'suggestions': []
             }), 500
         except Exception as e:
-            logger.error(f"Error parsing Gemini response: {e}")
-            logger.error(f"Response text: {response.text}")
+            logger.error("Error parsing Gemini response: %s", e)
+            logger.error("Response text: %s", response.text)
             return jsonify({
                 'error': 'Failed to generate suggestions',
                 'suggestions': []
             }), 500
         
     except Exception as e:
-        logger.error(f"Unexpected error in vacation suggestions: {e}")
+        logger.exception("Unexpected error in vacation suggestions: %s", e)
         return jsonify({'error': str(e)}), 500
 
 # ========== Transaction Update Endpoints ==========
@@ -791,12 +1532,10 @@ def update_transaction():
         if not transaction_id:
             return jsonify({'error': 'Missing transaction_id'}), 400
         
-        # Store updates in memory (in production, update database)
-        TRANSACTION_UPDATES[transaction_id] = {
-            **TRANSACTION_UPDATES.get(transaction_id, {}),
+        save_transaction_update(transaction_id, {
             **updates,
-            'updated_at': datetime.now().isoformat()
-        }
+            'updated_at': datetime.now(timezone.utc).isoformat()
+        })
         
         return jsonify({
             'success': True,
@@ -805,7 +1544,7 @@ def update_transaction():
             'updates': updates
         })
     except Exception as e:
-        print(f"Error updating transaction: {e}")
+        logger.exception("Error updating transaction: %s", e)
         return jsonify({'error': str(e)}), 500
 
 @app.route('/delete-transaction', methods=['POST'])
@@ -817,12 +1556,10 @@ def delete_transaction():
         if not transaction_id:
             return jsonify({'error': 'Missing transaction_id'}), 400
         
-        # Mark as deleted in memory (in production, update database)
-        TRANSACTION_UPDATES[transaction_id] = {
-            **TRANSACTION_UPDATES.get(transaction_id, {}),
+        save_transaction_update(transaction_id, {
             'deleted': True,
-            'deleted_at': datetime.now().isoformat()
-        }
+            'deleted_at': datetime.now(timezone.utc).isoformat()
+        })
         
         return jsonify({
             'success': True,
@@ -830,25 +1567,14 @@ def delete_transaction():
             'transaction_id': transaction_id
         })
     except Exception as e:
-        print(f"Error deleting transaction: {e}")
+        logger.exception("Error deleting transaction: %s", e)
         return jsonify({'error': str(e)}), 500
 
 # ========== Ask AI Widget Endpoint ==========
-@app.route('/ask-ai-widget', methods=['POST'])
-def ask_ai_widget():
-    try:
-        data = request.get_json()
-        widget_data = data.get('widgetData')
-        widget_name = data.get('widgetName')
-        
-        # Initialize Gemini model
-        model = genai.GenerativeModel('gemini-2.5-flash')
-        
-        # Create the prompt based on widget type
-        prompt = f"""You are an expert financial analyst with over 20 years of experience in personal finance management. You're reviewing data from a user's {widget_name} dashboard widget.
+WIDGET_PROMPT = string.Template("""You are an expert financial analyst with over 20 years of experience in personal finance management. You're reviewing data from a user's $widget_name dashboard widget.
 
 CONTEXT & DATA:
-{widget_data}
+$widget_data
 
 ANALYSIS FRAMEWORK:
 Please provide a comprehensive yet concise analysis covering:
@@ -880,23 +1606,86 @@ RESPONSE STYLE:
 - Use a professional yet approachable tone
 
 Begin your analysis now:
-        """
+""")
+
+@app.route('/ask-ai-widget', methods=['POST'])
+def ask_ai_widget():
+    try:
+        data = request.get_json()
+        widget_data = data.get('widgetData')
+        widget_name = data.get('widgetName')
+        # Clients opt in to token streaming with {"stream": true} or Accept: text/event-stream
+        stream = bool(data.get('stream')) or 'text/event-stream' in request.headers.get('Accept', '')
+        
+        # Reopening a widget with unchanged data reuses the earlier analysis
+        cache_key = f'widget:{widget_name}:{widget_data}'
+        cached_explanation = exact_cache_get(cache_key)
+        if cached_explanation is not None:
+            if stream:
+                response = _sse_response(_text_event_stream([cached_explanation], success=True))
+            else:
+                response = jsonify({
+                    'explanation': cached_explanation,
+                    'success': True
+                })
+            response.headers['X-Cache'] = 'HIT'
+            return response
+        
+        # Initialize Gemini model
+        model = get_gemini_model()
+        
+        # Create the prompt based on widget type
+        prompt = WIDGET_PROMPT.substitute(widget_name=widget_name, widget_data=widget_data)
+        
         # Send to Gemini API
+        if stream:
+            chunks = model.generate_content(prompt, stream=True)
+            pieces = (chunk.text for chunk in chunks)
+            def cache_explanation(text):
+                exact_cache_set(cache_key, text, WIDGET_CACHE_TTL)
+            
+            response = _sse_response(_text_event_stream(pieces, on_complete=cache_explanation, success=True))
+            response.headers['X-Cache'] = 'MISS'
+            return response
+        
         response = model.generate_content(prompt)
+        exact_cache_set(cache_key, response.text, WIDGET_CACHE_TTL)
         
-        return jsonify({
+        result = jsonify({
             'explanation': response.text,
             'success': True
         })
+        result.headers['X-Cache'] = 'MISS'
+        return result
         
     except Exception as e:
-        print(f"Error in ask_ai_widget: {e}")
+        logger.exception("Error in ask_ai_widget: %s", e)
         return jsonify({
             'error': str(e),
             'explanation': 'Unable to generate AI insights at this time. Please try again later.'
         }), 500
 
 # ========== Dashboard Endpoint ==========
+# Legacy account type (lowercased) -> (balance sheet side, breakdown key)
+ACCOUNT_BUCKETS = {
+    'checking': ('asset', 'checking'),
+    'savings': ('asset', 'savings'),
+    'investment': ('asset', 'investments'),
+    'credit card': ('liability', 'credit_cards'),
+    'loan': ('liability', 'loans')
+}
+
+def _dashboard_etag(source, accounts_data):
+    """Fingerprint the inputs of the dashboard payload for conditional requests"""
+    key = app.json.dumps([
+        source,
+        _PLAID_SNAPSHOT['cursor'],
+        [(acc['_id'], acc['balance']) for acc in accounts_data],
+        transaction_updates_version(),
+        datetime.now().strftime('%Y-%m-%d')
+    ])
+    return hashlib.blake2b(key.encode(), digest_size=8).hexdigest()
+
 @app.route('/get-dashboard-data', methods=['GET'])
 def get_dashboard_data():
     try:
@@ -904,67 +1693,34 @@ def get_dashboard_data():
         
         # Try to get data from Plaid
         try:
-            access_token = get_or_create_sandbox_token()
-            
-            # Get accounts from Plaid
-            balance_request = AccountsBalanceGetRequest(access_token=access_token)
-            balance_response = plaid_client.accounts_balance_get(balance_request)
-            
-            # Transform Plaid accounts to legacy format
-            accounts_data = [transform_plaid_account_to_legacy({
-                'account_id': acc['account_id'],
-                'name': acc['name'],
-                'type': acc['type'],
-                'subtype': acc.get('subtype'),
-                'balance': {
-                    'current': acc['balances'].get('current'),
-                    'available': acc['balances'].get('available')
-                }
-            }) for acc in balance_response['accounts']]
-            
-            # Get transactions from Plaid
-            cursor = PLAID_TRANSACTION_CURSORS.get('default', '')
-            all_plaid_transactions = []
-            has_more = True
-            
-            while has_more:
-                sync_request = TransactionsSyncRequest(
-                    access_token=access_token,
-                    cursor=cursor if cursor else None
-                )
-                sync_response = plaid_client.transactions_sync(sync_request)
-                
-                for trans in sync_response['added']:
-                    all_plaid_transactions.append({
-                        'transaction_id': trans['transaction_id'],
-                        'account_id': trans['account_id'],
-                        'date': trans['date'],
-                        'name': trans['name'],
-                        'merchant_name': trans.get('merchant_name'),
-                        'amount': trans['amount'],
-                        'category': trans.get('category', []),
-                        'pending': trans['pending']
-                    })
-                
-                cursor = sync_response['next_cursor']
-                has_more = sync_response['has_more']
-                
-                if len(all_plaid_transactions) > 100:
-                    break
-            
-            PLAID_TRANSACTION_CURSORS['default'] = cursor
-            
-            # Transform to legacy format
-            all_transactions = [transform_plaid_transaction_to_legacy(t) for t in all_plaid_transactions]
+            accounts_data, plaid_transactions = _get_plaid_snapshot()
+            source = 'plaid'
             
         except plaid.ApiException as e:
-            logger.warning(f"Plaid API error, falling back to mock data: {e}")
+            logger.warning("Plaid API error, falling back to mock data: %s", e)
             # Fall back to mock data if Plaid fails
             accounts_data = []
-            all_transactions = generate_realistic_transactions(30, [])
+            plaid_transactions = None
+            source = 'mock'
         except Exception as e:
-            logger.warning(f"Error getting Plaid data, falling back to mock: {e}")
+            logger.warning("Error getting Plaid data, falling back to mock: %s", e)
             accounts_data = []
+            plaid_transactions = None
+            source = 'mock'
+        
+        # The payload only changes with the Plaid data, transaction updates or the day
+        etag = _dashboard_etag(source, accounts_data)
+        # Flask-Compress rewrites the ETag of compressed responses to "<tag>:<algorithm>",
+        # and that suffixed value is what browsers send back
+        if any(request.if_none_match.contains(tag) for tag in (etag, f'{etag}:br', f'{etag}:gzip')):
+            response = make_response('', 304)
+            response.set_etag(etag)
+            return response
+        
+        if plaid_transactions is not None:
+            # Transform to legacy format as the single pass below consumes them
+            all_transactions = (transform_plaid_transaction_to_legacy(t) for t in plaid_transactions)
+        else:
             all_transactions = generate_realistic_transactions(30, [])
         
         # Calculate real net worth from accounts
@@ -977,54 +1733,64 @@ def get_dashboard_data():
             balance = float(account.get('balance', 0))
             account_type = account.get('type', '').lower()
             
-            if account_type in ['checking', 'savings']:
+            side, bucket = ACCOUNT_BUCKETS.get(account_type, (None, None))
+            if side == 'asset':
                 total_assets += balance
-                if account_type == 'checking':
-                    assets_breakdown['checking'] += balance
-                else:
-                    assets_breakdown['savings'] += balance
-            elif account_type == 'credit card':
+                assets_breakdown[bucket] += balance
+            elif side == 'liability':
                 total_liabilities += abs(balance)
-                liabilities_breakdown['credit_cards'] += abs(balance)
-            elif account_type == 'investment':
-                total_assets += balance
-                assets_breakdown['investments'] += balance
-            elif account_type == 'loan':
-                total_liabilities += abs(balance)
-                liabilities_breakdown['loans'] += abs(balance)
+                liabilities_breakdown[bucket] += abs(balance)
         
         net_worth = total_assets - total_liabilities
         
-        # Apply any updates from TRANSACTION_UPDATES
-        for transaction in all_transactions:
-            trans_id = transaction.get('_id')
-            if trans_id in TRANSACTION_UPDATES:
-                transaction.update(TRANSACTION_UPDATES[trans_id])
-        
-        # Filter out deleted transactions
-        all_transactions = [t for t in all_transactions if not t.get('deleted', False)]
-        
-        # Sort by date
-        all_transactions.sort(key=lambda x: x.get('purchase_date', ''), reverse=True)
-        
-        # Calculate budget metrics from transactions
-        today = datetime.now()
-        first_of_month = today.replace(day=1)
+        # Apply user edits, drop deleted transactions and total this month's income
+        # and expenses in a single pass.
+        # ISO dates order lexicographically, so compare strings instead of parsing.
+        # Month-to-date starts at midnight on the 1st, so the 1st itself counts
+        first_of_month = datetime.now().replace(day=1, hour=0, minute=0, second=0, microsecond=0)
+        first_of_month_str = first_of_month.strftime('%Y-%m-%d')
+        transaction_updates, deleted_ids = load_transaction_updates()
         
         current_month_expenses = 0
         current_month_income = 0
+        transactions = []
+        append = transactions.append
         
         for transaction in all_transactions:
+            # Most requests have no overrides at all
+            if transaction_updates or deleted_ids:
+                trans_id = transaction.get('_id')
+                if trans_id in deleted_ids:
+                    continue
+                updates = transaction_updates.get(trans_id)
+                if updates:
+                    transaction.update(updates)
+            append(transaction)
+            
+            purchase_date = str(transaction.get('purchase_date', ''))
+            if len(purchase_date) == 10 and purchase_date[4] == '-' and purchase_date[7] == '-':
+                if purchase_date < first_of_month_str:
+                    continue
+            else:
+                # Anything else falls back to parsing; unparseable dates are skipped
+                try:
+                    if _parse_ymd(purchase_date) < first_of_month:
+                        continue
+                except ValueError:
+                    continue
             try:
-                trans_date = datetime.strptime(transaction.get('purchase_date', ''), '%Y-%m-%d')
-                if trans_date >= first_of_month:
-                    amount = float(transaction.get('amount', 0))
-                    if amount < 0:
-                        current_month_expenses += abs(amount)
-                    else:
-                        current_month_income += amount
-            except:
-                pass
+                amount = float(transaction.get('amount', 0))
+            except (TypeError, ValueError):
+                continue
+            if amount < 0:
+                current_month_expenses += abs(amount)
+            else:
+                current_month_income += amount
+        
+        # Only the newest ten are returned, so select them rather than sorting
+        # everything. The legacy transform and the generator always set
+        # purchase_date, so the C-level itemgetter key is safe here
+        recent_transactions = nlargest(10, transactions, key=itemgetter('purchase_date'))
         
         # Estimate savings
         current_savings = current_month_income - current_month_expenses
@@ -1055,27 +1821,23 @@ def get_dashboard_data():
             'assets_liabilities': {
                 'assets': {
                     'total': round(total_assets, 2),
-                    'breakdown': {
-                        'checking': round(assets_breakdown['checking'], 2),
-                        'savings': round(assets_breakdown['savings'], 2),
-                        'investments': round(assets_breakdown['investments'], 2)
-                    }
+                    'breakdown': {key: round(value, 2) for key, value in assets_breakdown.items()}
                 },
                 'liabilities': {
                     'total': round(total_liabilities, 2),
-                    'breakdown': {
-                        'credit_cards': round(liabilities_breakdown['credit_cards'], 2),
-                        'loans': round(liabilities_breakdown['loans'], 2)
-                    }
+                    'breakdown': {key: round(value, 2) for key, value in liabilities_breakdown.items()}
                 }
             },
-            'transactions': all_transactions[:10]
+            'transactions': recent_transactions
         }
         
-        return jsonify(dashboard_data)
+        response = make_response(jsonify(dashboard_data))
+        response.set_etag(etag)
+        response.headers['Cache-Control'] = 'private, max-age=30'
+        return response
         
     except Exception as e:
-        print(f"Error in get_dashboard_data: {str(e)}")
+        logger.exception("Error in get_dashboard_data: %s", e)
         return jsonify({'error': str(e)}), 500
 
 
@@ -1096,124 +1858,79 @@ def get_all_transactions():
         
         # Try to get data from Plaid
         try:
-            access_token = get_or_create_sandbox_token()
-            
-            # Get accounts from Plaid
-            balance_request = AccountsBalanceGetRequest(access_token=access_token)
-            balance_response = plaid_client.accounts_balance_get(balance_request)
-            
-            # Transform Plaid accounts to legacy format
-            accounts_data = [transform_plaid_account_to_legacy({
-                'account_id': acc['account_id'],
-                'name': acc['name'],
-                'type': acc['type'],
-                'subtype': acc.get('subtype'),
-                'balance': {
-                    'current': acc['balances'].get('current'),
-                    'available': acc['balances'].get('available')
-                }
-            }) for acc in balance_response['accounts']]
-            
-            # Get transactions from Plaid
-            cursor = PLAID_TRANSACTION_CURSORS.get('default', '')
-            all_plaid_transactions = []
-            has_more = True
-            
-            while has_more:
-                sync_request = TransactionsSyncRequest(
-                    access_token=access_token,
-                    cursor=cursor if cursor else None
-                )
-                sync_response = plaid_client.transactions_sync(sync_request)
-                
-                for trans in sync_response['added']:
-                    all_plaid_transactions.append({
-                        'transaction_id': trans['transaction_id'],
-                        'account_id': trans['account_id'],
-                        'date': trans['date'],
-                        'name': trans['name'],
-                        'merchant_name': trans.get('merchant_name'),
-                        'amount': trans['amount'],
-                        'category': trans.get('category', []),
-                        'pending': trans['pending']
-                    })
-                
-                cursor = sync_response['next_cursor']
-                has_more = sync_response['has_more']
-                
-                if len(all_plaid_transactions) > 500:
-                    break
-            
-            PLAID_TRANSACTION_CURSORS['default'] = cursor
+            accounts_data, all_plaid_transactions = _get_plaid_snapshot()
             
             # Transform to legacy format with account info
+            acct_by_id = {acc['_id']: acc for acc in accounts_data}
             for plaid_trans in all_plaid_transactions:
                 legacy_trans = transform_plaid_transaction_to_legacy(plaid_trans)
-                # Find matching account
-                for acc in accounts_data:
-                    if acc['_id'] == plaid_trans['account_id']:
-                        legacy_trans['account_type'] = acc.get('type', 'Unknown')
-                        legacy_trans['account_name'] = acc.get('nickname', 'Account')
-                        break
+                acc = acct_by_id.get(plaid_trans['account_id'])
+                if acc:
+                    legacy_trans['account_type'] = acc.get('type', 'Unknown')
+                    legacy_trans['account_name'] = acc.get('nickname', 'Account')
                 all_transactions.append(legacy_trans)
                 
         except plaid.ApiException as e:
-            logger.warning(f"Plaid API error, using mock data: {e}")
+            logger.warning("Plaid API error, using mock data: %s", e)
             all_transactions = generate_realistic_transactions(days_int, accounts_data)
         except Exception as e:
-            logger.warning(f"Error getting Plaid data, using mock: {e}")
-            all_transactions = generate_realistic_transactions(days_int, accounts_data)
-        
-        # Apply updates from TRANSACTION_UPDATES
-        for transaction in all_transactions:
-            trans_id = transaction.get('_id')
-            if trans_id in TRANSACTION_UPDATES:
-                transaction.update(TRANSACTION_UPDATES[trans_id])
-        
-        # Filter out deleted transactions
-        all_transactions = [t for t in all_transactions if not t.get('deleted', False)]
-        
-        # If API returns limited data, generate realistic transactions for the time period
-        if len(all_transactions) < 10:
+            logger.warning("Error getting Plaid data, using mock: %s", e)
             all_transactions = generate_realistic_transactions(days_int, accounts_data)
         
-        # Filter by date range
+        # Apply updates, drop deleted transactions, filter by date range and
+        # group by date in a single pass
         cutoff_date = datetime.now() - timedelta(days=days_int)
+        cutoff_str = cutoff_date.strftime('%Y-%m-%d')
         
         filtered_transactions = []
+        grouped_transactions = defaultdict(list)
+        remaining_count = 0
+        transaction_updates, deleted_ids = load_transaction_updates()
         for transaction in all_transactions:
-            try:
-                trans_date = datetime.strptime(str(transaction.get('purchase_date', '')), '%Y-%m-%d')
-                if trans_date >= cutoff_date:
-                    filtered_transactions.append(transaction)
-            except:
-                # If date parsing fails, include the transaction
-                filtered_transactions.append(transaction)
+            trans_id = transaction.get('_id')
+            if trans_id in deleted_ids:
+                continue
+            if trans_id in transaction_updates:
+                transaction.update(transaction_updates[trans_id])
+            remaining_count += 1
+            
+            purchase_date = str(transaction.get('purchase_date', ''))
+            if len(purchase_date) == 10 and purchase_date[4] == '-' and purchase_date[7] == '-':
+                if purchase_date <= cutoff_str:
+                    continue
+            else:
+                try:
+                    if _parse_ymd(purchase_date) < cutoff_date:
+                        continue
+                except:
+                    # If date parsing fails, include the transaction
+                    pass
+            filtered_transactions.append(transaction)
+            grouped_transactions[purchase_date or 'Unknown'].append(transaction)
         
-        # Sort by date (most recent first)
-        filtered_transactions.sort(key=lambda x: x.get('purchase_date', ''), reverse=True)
+        # If API returns limited data, generate realistic transactions for the time period
+        if remaining_count < 10:
+            filtered_transactions = generate_realistic_transactions(days_int, accounts_data)
+            grouped_transactions = defaultdict(list)
+            for transaction in filtered_transactions:
+                grouped_transactions[transaction['purchase_date']].append(transaction)
         
-        # Group transactions by date for timeline
-        grouped_transactions = defaultdict(list)
+        # Sort by date (most recent first)
+        filtered_transactions.sort(key=itemgetter('purchase_date'), reverse=True)
+        
+        # Use AI categories already in the cache and queue the rest for the background
+        # categorizer, so the response never waits on the model
+        head = filtered_transactions[:20]
+        keys = [_category_cache_key(t) for t in head]
+        queue_categorization([t for t, key in zip(head, keys) if key not in CATEGORY_CACHE])
+        
+        for transaction, key in zip(head, keys):
+            category = CATEGORY_CACHE.get(key)
+            if category:
+                transaction['category'] = category
         for transaction in filtered_transactions:
-            date = transaction.get('purchase_date', 'Unknown')
-            grouped_transactions[date].append(transaction)
-        
-        # Get AI categorization for transactions
-        if filtered_transactions:
-            try:
-                categorization_response = categorize_transactions(filtered_transactions[:20])
-                categorized_map = {t['_id']: t.get('category', 'Other') for t in categorization_response.get('categorized_transactions', [])}
-                
-                for transaction in filtered_transactions:
-                    if transaction.get('_id') in categorized_map:
-                        transaction['category'] = categorized_map[transaction['_id']]
-                    elif not transaction.get('category'):
-                        transaction['category'] = 'Other'
-            except:
-                for transaction in filtered_transactions:
-                    if not transaction.get('category'):
-                        transaction['category'] = 'Other'
+            if not transaction.get('category'):
+                transaction['category'] = 'Other'
         
         return jsonify({
             'transactions': filtered_transactions,
@@ -1223,118 +1940,152 @@ def get_all_transactions():
         })
         
     except Exception as e:
-        print(f"Error in get_all_transactions: {str(e)}")
+        logger.exception("Error in get_all_transactions: %s", e)
         return jsonify({'error': str(e)}), 500
 
 
+# Common merchants and categories for generated demo data
+DEMO_MERCHANTS = [
+    {'name': 'Starbucks Coffee', 'category': 'Food & Drink', 'range': (4, 12)},
+    {'name': 'Whole Foods Market', 'category': 'Groceries', 'range': (45, 150)},
+    {'name': 'Shell Gas Station', 'category': 'Transport', 'range': (35, 65)},
+    {'name': 'Amazon.com', 'category': 'Shopping', 'range': (20, 200)},
+    {'name': 'Netflix', 'category': 'Entertainment', 'range': (15, 20)},
+    {'name': 'Uber', 'category': 'Transport', 'range': (8, 35)},
+    {'name': 'Target', 'category': 'Shopping', 'range': (25, 120)},
+    {'name': 'Chipotle', 'category': 'Food & Drink', 'range': (10, 18)},
+    {'name': 'CVS Pharmacy', 'category': 'Healthcare', 'range': (15, 75)},
+    {'name': 'Planet Fitness', 'category': 'Entertainment', 'range': (45, 45)},
+    {'name': 'ATM Withdrawal', 'category': 'Other', 'range': (40, 200)},
+    {'name': 'Verizon Wireless', 'category': 'Bills & Utilities', 'range': (85, 95)},
+    {'name': 'Electric Company', 'category': 'Bills & Utilities', 'range': (100, 180)},
+    {'name': 'Spotify', 'category': 'Entertainment', 'range': (10, 11)},
+    {'name': 'Trader Joes', 'category': 'Groceries', 'range': (30, 90)},
+    {'name': 'McDonalds', 'category': 'Food & Drink', 'range': (6, 15)},
+    {'name': 'Home Depot', 'category': 'Shopping', 'range': (40, 250)},
+    {'name': 'Walmart', 'category': 'Shopping', 'range': (25, 100)},
+    {'name': 'Subway', 'category': 'Food & Drink', 'range': (8, 12)},
+    {'name': 'Apple Store', 'category': 'Shopping', 'range': (50, 500)},
+]
+
+# Income sources for generated demo data
+DEMO_INCOME_SOURCES = [
+    {'name': 'Payroll Deposit', 'amount': 2500},
+    {'name': 'Direct Deposit - Employer', 'amount': 2500},
+]
+
+def _load_generated_transactions(days):
+    """Return (days_key, transactions) generated today covering at least days, or None"""
+    conn = get_db_connection()
+    row = conn.execute('''
+        SELECT days_key, data_json FROM generated_txn_cache
+        WHERE days_key >= ? AND date(created_at) = date('now', 'localtime')
+        ORDER BY days_key DESC LIMIT 1
+    ''', (days,)).fetchone()
+    conn.close()
+    return (row[0], app.json.loads(row[1])) if row else None
+
+def _store_generated_transactions(days_key, transactions):
+    conn = get_db_connection()
+    with conn:
+        conn.execute(
+            'INSERT OR REPLACE INTO generated_txn_cache (days_key, data_json, created_at) VALUES (?, ?, ?)',
+            (days_key, app.json.dumps(transactions), datetime.now().isoformat())
+        )
+    conn.close()
+
+def _generated_since(transactions, days):
+    """Keep generated transactions dated after the cutoff days ago.
+    
+    Generated dates are always 'YYYY-MM-DD', which order lexicographically, so
+    compare the strings instead of parsing each one. A date is kept when its
+    midnight is at or after now - days, i.e. when it falls after the cutoff day.
+    """
+    cutoff_str = (datetime.now() - timedelta(days=days)).strftime('%Y-%m-%d')
+    return [t for t in transactions if t['purchase_date'] > cutoff_str]
+
 def generate_realistic_transactions(days, accounts):
     """Generate realistic transaction data for demonstration.
     
     Results are cached so the same transactions appear on each request.
     """
     global CACHED_TRANSACTIONS
-    import random
     
     # Check if we have cached transactions that cover the requested period
     if (CACHED_TRANSACTIONS['data'] is not None and 
         CACHED_TRANSACTIONS['generated_for_days'] is not None and
         CACHED_TRANSACTIONS['generated_for_days'] >= days):
         # Filter cached transactions to the requested date range
-        cutoff_date = datetime.now() - timedelta(days=days)
-        return [
-            t for t in CACHED_TRANSACTIONS['data']
-            if datetime.strptime(t['purchase_date'], '%Y-%m-%d') >= cutoff_date
-        ]
+        return _generated_since(CACHED_TRANSACTIONS['data'], days)
+    
+    # Reuse today's set if another worker (or an earlier run) already generated it
+    stored = _load_generated_transactions(days)
+    if stored is not None:
+        CACHED_TRANSACTIONS['generated_for_days'], CACHED_TRANSACTIONS['data'] = stored
+        return _generated_since(CACHED_TRANSACTIONS['data'], days)
     
     # Generate new transactions with a fixed seed for reproducibility
-    random.seed(42)  # Fixed seed ensures same transactions every time
+    rng = random.Random(42)  # Fixed seed ensures same transactions every time
+    randint, choice, uniform = rng.randint, rng.choice, rng.uniform
     
     transactions = []
+    append = transactions.append
     today = datetime.now()
     
     # Always generate for a full year to cover all date range requests
     generation_days = max(days, 365)
     
-    # Common merchants and categories
-    merchants = [
-        {'name': 'Starbucks Coffee', 'category': 'Food & Drink', 'range': (4, 12)},
-        {'name': 'Whole Foods Market', 'category': 'Groceries', 'range': (45, 150)},
-        {'name': 'Shell Gas Station', 'category': 'Transport', 'range': (35, 65)},
-        {'name': 'Amazon.com', 'category': 'Shopping', 'range': (20, 200)},
-        {'name': 'Netflix', 'category': 'Entertainment', 'range': (15, 20)},
-        {'name': 'Uber', 'category': 'Transport', 'range': (8, 35)},
-        {'name': 'Target', 'category': 'Shopping', 'range': (25, 120)},
-        {'name': 'Chipotle', 'category': 'Food & Drink', 'range': (10, 18)},
-        {'name': 'CVS Pharmacy', 'category': 'Healthcare', 'range': (15, 75)},
-        {'name': 'Planet Fitness', 'category': 'Entertainment', 'range': (45, 45)},
-        {'name': 'ATM Withdrawal', 'category': 'Other', 'range': (40, 200)},
-        {'name': 'Verizon Wireless', 'category': 'Bills & Utilities', 'range': (85, 95)},
-        {'name': 'Electric Company', 'category': 'Bills & Utilities', 'range': (100, 180)},
-        {'name': 'Spotify', 'category': 'Entertainment', 'range': (10, 11)},
-        {'name': 'Trader Joes', 'category': 'Groceries', 'range': (30, 90)},
-        {'name': 'McDonalds', 'category': 'Food & Drink', 'range': (6, 15)},
-        {'name': 'Home Depot', 'category': 'Shopping', 'range': (40, 250)},
-        {'name': 'Walmart', 'category': 'Shopping', 'range': (25, 100)},
-        {'name': 'Subway', 'category': 'Food & Drink', 'range': (8, 12)},
-        {'name': 'Apple Store', 'category': 'Shopping', 'range': (50, 500)},
-    ]
-    
-    # Add income transactions
-    income_sources = [
-        {'name': 'Payroll Deposit', 'amount': 2500},
-        {'name': 'Direct Deposit - Employer', 'amount': 2500},
-    ]
+    # Format every date once up front
+    dates = [(today - timedelta(days=day)).strftime('%Y-%m-%d') for day in range(generation_days)]
     
     account = accounts[0] if accounts else {'_id': 'demo_account', 'type': 'Checking', 'nickname': 'Main Account'}
+    account_type = account.get('type', 'Checking')
+    account_name = account.get('nickname', 'Account')
     
     # Generate transactions over the time period
-    for day in range(generation_days):
-        date = (today - timedelta(days=day)).strftime('%Y-%m-%d')
-        
+    for day, date in enumerate(dates):
         # Add 2-5 transactions per day
-        num_transactions = random.randint(2, 5)
+        num_transactions = randint(2, 5)
         
         for _ in range(num_transactions):
-            merchant = random.choice(merchants)
-            amount = round(random.uniform(merchant['range'][0], merchant['range'][1]), 2)
+            merchant = choice(DEMO_MERCHANTS)
+            low, high = merchant['range']
+            amount = round(uniform(low, high), 2)
             
-            transactions.append({
+            append({
                 '_id': f"trans_{date}_{len(transactions)}",
                 'description': merchant['name'],
                 'amount': -amount,  # Negative for expenses
                 'purchase_date': date,
                 'status': 'executed',
-                'account_type': account.get('type', 'Checking'),
-                'account_name': account.get('nickname', 'Account'),
+                'account_type': account_type,
+                'account_name': account_name,
                 'category': merchant['category']
             })
         
         # Add income every 2 weeks (bi-weekly paycheck)
         if day % 14 == 0 and day > 0:
-            income = random.choice(income_sources)
-            transactions.append({
+            income = choice(DEMO_INCOME_SOURCES)
+            append({
                 '_id': f"income_{date}",
                 'description': income['name'],
                 'amount': income['amount'],
                 'purchase_date': date,
                 'status': 'executed',
-                'account_type': account.get('type', 'Checking'),
-                'account_name': account.get('nickname', 'Account'),
+                'account_type': account_type,
+                'account_name': account_name,
                 'category': 'Income'
             })
     
     # Cache the generated transactions
     CACHED_TRANSACTIONS['data'] = transactions
     CACHED_TRANSACTIONS['generated_for_days'] = generation_days
+    _store_generated_transactions(generation_days, transactions)
     
-    logger.info(f"Generated and cached {len(transactions)} transactions for {generation_days} days")
+    logger.info("Generated and cached %s transactions for %s days", len(transactions), generation_days)
     
     # Filter to requested date range
-    cutoff_date = datetime.now() - timedelta(days=days)
-    return [
-        t for t in transactions
-        if datetime.strptime(t['purchase_date'], '%Y-%m-%d') >= cutoff_date
-    ]
+    return _generated_since(transactions, days)
 
 # ========== Recurring Expenses Endpoint ==========
 @app.route('/get-recurring-expenses', methods=['GET'])
@@ -1346,48 +2097,16 @@ def get_recurring_expenses():
         
         # Try to get data from Plaid
         try:
-            access_token = get_or_create_sandbox_token()
-            
-            # Get transactions from Plaid
-            cursor = PLAID_TRANSACTION_CURSORS.get('default', '')
-            all_plaid_transactions = []
-            has_more = True
-            
-            while has_more:
-                sync_request = TransactionsSyncRequest(
-                    access_token=access_token,
-                    cursor=cursor if cursor else None
-                )
-                sync_response = plaid_client.transactions_sync(sync_request)
-                
-                for trans in sync_response['added']:
-                    all_plaid_transactions.append({
-                        'transaction_id': trans['transaction_id'],
-                        'account_id': trans['account_id'],
-                        'date': trans['date'],
-                        'name': trans['name'],
-                        'merchant_name': trans.get('merchant_name'),
-                        'amount': trans['amount'],
-                        'category': trans.get('category', []),
-                        'pending': trans['pending']
-                    })
-                
-                cursor = sync_response['next_cursor']
-                has_more = sync_response['has_more']
-                
-                if len(all_plaid_transactions) > 500:
-                    break
-            
-            PLAID_TRANSACTION_CURSORS['default'] = cursor
+            _, all_plaid_transactions = _get_plaid_snapshot()
             
             # Transform to legacy format
             all_transactions = [transform_plaid_transaction_to_legacy(t) for t in all_plaid_transactions]
             
         except plaid.ApiException as e:
-            logger.warning(f"Plaid API error, using mock transactions: {e}")
+            logger.warning("Plaid API error, using mock transactions: %s", e)
             all_transactions = generate_realistic_transactions(90, [])
         except Exception as e:
-            logger.warning(f"Error getting Plaid data: {e}")
+            logger.warning("Error getting Plaid data: %s", e)
             all_transactions = generate_realistic_transactions(90, [])
         
         # Detect recurring from transaction patterns (Plaid doesn't have bills/loans like Nessie)
@@ -1411,7 +2130,7 @@ def get_recurring_expenses():
         })
         
     except Exception as e:
-        print(f"Error in get_recurring_expenses: {str(e)}")
+        logger.exception("Error in get_recurring_expenses: %s", e)
         return jsonify({'error': str(e)}), 500
 
 
@@ -1429,9 +2148,9 @@ def calculate_next_due(last_date):
     """Calculate next due date based on last payment"""
     if last_date:
         try:
-            last = datetime.strptime(last_date, '%Y-%m-%d')
+            last = _parse_ymd(last_date)
             next_due = last + timedelta(days=30)
-            return next_due.strftime('%Y-%m-%d')
+            return next_due.date().isoformat()
         except:
             pass
     
@@ -1440,9 +2159,22 @@ def calculate_next_due(last_date):
     next_due = today + timedelta(days=15)
     return next_due.strftime('%Y-%m-%d')
 
+# Demo recurring expenses only change when the day rolls over
+DEMO_RECURRING_CACHE = {
+    'day': None,
+    'data': None
+}
+
 def get_demo_recurring_expenses():
-    """Provide realistic demo data when API returns no data"""
+    """Provide realistic demo data when API returns no data.
+    
+    The expense dicts are shared between requests and must not be mutated;
+    the returned list itself is a fresh copy and can be sorted.
+    """
     today = datetime.now()
+    day = today.date().toordinal()
+    if DEMO_RECURRING_CACHE['day'] == day:
+        return list(DEMO_RECURRING_CACHE['data'])
     
     demo_expenses = [
         {
@@ -1588,15 +2320,38 @@ def get_demo_recurring_expenses():
         },
     ]
     
-    return demo_expenses
+    DEMO_RECURRING_CACHE['day'] = day
+    DEMO_RECURRING_CACHE['data'] = demo_expenses
+    
+    return list(demo_expenses)
+
+# Time until the next charge for each detected frequency
+FREQUENCY_DELTAS = {
+    'Weekly': timedelta(days=7),
+    'Bi-weekly': timedelta(days=14),
+    'Monthly': timedelta(days=30),
+    'Irregular': timedelta(days=30)
+}
+DEFAULT_FREQUENCY_DELTA = timedelta(days=30)
+
+_STOPWORDS = frozenset({'the', 'at', 'in', 'on', 'payment', 'bill', 'auto'})
+
+@lru_cache(maxsize=4096)
+def _normalize_desc(desc):
+    """Drop stopwords and numbers from a lowercased description, keeping the first 30 chars"""
+    return ' '.join(
+        word for word in desc.split()
+        if word not in _STOPWORDS and not word.isdigit()
+    )[:30]
 
 def detect_recurring_expenses(transactions):
     """Detect recurring expenses from transaction list"""
     if not transactions or len(transactions) < 2:
         return []
     
-    # Group similar transactions by description (improved matching)
-    description_groups = defaultdict(list)
+    # Group similar transactions by description (improved matching), keeping
+    # running amount stats so each group is only walked once
+    description_groups = {}
     
     for transaction in transactions:
         desc = transaction.get('description', '').lower()
@@ -1608,14 +2363,26 @@ def detect_recurring_expenses(transactions):
             continue
         
         # Normalize description - remove common words and numbers
-        normalized_desc = ' '.join([
-            word for word in desc.split() 
-            if word not in ['the', 'at', 'in', 'on', 'payment', 'bill', 'auto']
-            and not word.isdigit()
-        ])[:30]  # Take first 30 chars
+        normalized_desc = _normalize_desc(desc)
         
         if normalized_desc:
-            description_groups[normalized_desc].append({
+            stats = description_groups.get(normalized_desc)
+            if stats is None:
+                stats = description_groups[normalized_desc] = {
+                    'total': 0.0,
+                    'min': amount,
+                    'max': amount,
+                    'dates': [],
+                    'transactions': []
+                }
+            stats['total'] += amount
+            if amount < stats['min']:
+                stats['min'] = amount
+            elif amount > stats['max']:
+                stats['max'] = amount
+            if date:
+                stats['dates'].append(date)
+            stats['transactions'].append({
                 'amount': amount,
                 'date': date,
                 'description': transaction.get('description', ''),
@@ -1625,24 +2392,24 @@ def detect_recurring_expenses(transactions):
     # Identify recurring patterns (2+ transactions with similar amounts)
     recurring = []
     
-    for key, group in description_groups.items():
+    for key, stats in description_groups.items():
+        group = stats['transactions']
         if len(group) >= 2:  # At least 2 occurrences
-            amounts = [t['amount'] for t in group]
-            avg_amount = sum(amounts) / len(amounts)
+            avg_amount = stats['total'] / len(group)
             
             # Check if amounts are similar (within 30% variance for utilities)
-            variance = max(amounts) - min(amounts)
+            variance = stats['max'] - stats['min']
             if avg_amount > 0 and (variance / avg_amount <= 0.3 or len(group) >= 3):
                 # Calculate frequency
-                dates = sorted([t['date'] for t in group if t['date']])
+                dates = sorted(stats['dates'])
                 
                 frequency = 'Monthly'
                 if len(dates) >= 2:
                     try:
-                        # Calculate average days between transactions
-                        date_objects = [datetime.strptime(d, '%Y-%m-%d') for d in dates]
-                        gaps = [(date_objects[i+1] - date_objects[i]).days for i in range(len(date_objects)-1)]
-                        avg_gap = sum(gaps) / len(gaps) if gaps else 30
+                        # Calculate average days between transactions; on sorted
+                        # dates the consecutive gaps sum to the first-to-last span
+                        span = (_parse_ymd(dates[-1]) - _parse_ymd(dates[0])).days
+                        avg_gap = span / (len(dates) - 1)
                         
                         if avg_gap < 10:
                             frequency = 'Weekly'
@@ -1657,17 +2424,10 @@ def detect_recurring_expenses(transactions):
                 
                 # Determine next due date
                 if dates:
-                    last_date = datetime.strptime(dates[-1], '%Y-%m-%d')
+                    last_date = _parse_ymd(dates[-1])
                     
                     # Add appropriate days based on frequency
-                    days_to_add = {
-                        'Weekly': 7,
-                        'Bi-weekly': 14,
-                        'Monthly': 30,
-                        'Irregular': 30
-                    }.get(frequency, 30)
-                    
-                    next_date = (last_date + timedelta(days=days_to_add)).strftime('%Y-%m-%d')
+                    next_date = (last_date + FREQUENCY_DELTAS.get(frequency, DEFAULT_FREQUENCY_DELTA)).date().isoformat()
                 else:
                     next_date = None
                 
@@ -1688,29 +2448,50 @@ def detect_recurring_expenses(transactions):
     
     return recurring
 
+# Keyword rules for recurring expenses, checked in order; first match wins
+RECURRING_CATEGORY_RULES = (
+    ('Housing', ('rent', 'mortgage', 'hoa', 'apartment', 'property', 'lease')),
+    ('Utilities', ('electric', 'gas', 'water', 'sewer', 'internet', 'cable', 'wifi', 'utility', 'power', 'energy')),
+    ('Insurance', ('insurance', 'premium', 'policy', 'geico', 'state farm', 'allstate', 'progressive')),
+    ('Subscriptions', ('netflix', 'spotify', 'hulu', 'disney', 'amazon prime', 'subscription', 'membership', 'gym', 'fitness', 'youtube', 'apple music')),
+    ('Transportation', ('car payment', 'auto', 'vehicle', 'toyota', 'honda', 'ford', 'chevrolet', 'bmw', 'uber', 'lyft')),
+    ('Phone', ('phone', 'mobile', 'verizon', 'at&t', 't-mobile', 'sprint', 'cellular', 'wireless')),
+    ('Loans', ('loan', 'student loan', 'personal loan', 'credit')),
+)
+
+def _compile_category_rules(rules):
+    """Turn (category, keywords) rules into (category, pattern) with one alternation per category"""
+    return tuple(
+        (category, re.compile('|'.join(re.escape(keyword) for keyword in keywords)))
+        for category, keywords in rules
+    )
+
+RECURRING_CATEGORY_PATTERNS = _compile_category_rules(RECURRING_CATEGORY_RULES)
+
+@cache
 def categorize_recurring(description):
     """Smart category detection for recurring expenses"""
     desc_lower = description.lower()
     
-    categories = {
-        'Housing': ['rent', 'mortgage', 'hoa', 'apartment', 'property', 'lease'],
-        'Utilities': ['electric', 'gas', 'water', 'sewer', 'internet', 'cable', 'wifi', 'utility', 'power', 'energy'],
-        'Insurance': ['insurance', 'premium', 'policy', 'geico', 'state farm', 'allstate', 'progressive'],
-        'Subscriptions': ['netflix', 'spotify', 'hulu', 'disney', 'amazon prime', 'subscription', 'membership', 'gym', 'fitness', 'youtube', 'apple music'],
-        'Transportation': ['car payment', 'auto', 'vehicle', 'toyota', 'honda', 'ford', 'chevrolet', 'bmw', 'uber', 'lyft'],
-        'Phone': ['phone', 'mobile', 'verizon', 'at&t', 't-mobile', 'sprint', 'cellular', 'wireless'],
-        'Loans': ['loan', 'student loan', 'personal loan', 'credit'],
-    }
-    
-    for category, keywords in categories.items():
-        if any(keyword in desc_lower for keyword in keywords):
+    for category, pattern in RECURRING_CATEGORY_PATTERNS:
+        if pattern.search(desc_lower):
             return category
     
     return 'Other'
 
-def categorize_transactions(transactions):
-    """Use AI to categorize transactions"""
-    prompt = f"""You are an expert financial analyst with deep expertise in transaction categorization. 
+# AI categories keyed by (description, amount rounded to the dollar) so repeat polls skip the model
+CATEGORY_CACHE = OrderedDict()
+CATEGORY_CACHE_MAX = 10000
+
+def _category_cache_key(transaction):
+    """Key a transaction by description and amount rounded to the nearest dollar for CATEGORY_CACHE"""
+    try:
+        amount = round(float(transaction.get('amount', 0)))
+    except (TypeError, ValueError):
+        amount = 0
+    return (transaction.get('description', ''), amount)
+
+CATEGORIZE_PROMPT_PREFIX = """You are an expert financial analyst with deep expertise in transaction categorization. 
 
 TASK: Categorize the following bank transactions with high accuracy.
 
@@ -1732,41 +2513,106 @@ CATEGORIZATION GUIDELINES:
 4. Default to "Other" only when truly ambiguous
 
 RESPONSE FORMAT (JSON only, no explanations):
-{{
+{
   "categorized_transactions": [
-    {{
+    {
       "_id": "transaction_id",
       "category": "Category Name"
-    }}
+    }
   ]
-}}
+}
 
 TRANSACTIONS TO CATEGORIZE:
-{transactions[:20]}
+"""
+
+CATEGORIZE_PROMPT_SUFFIX = """
 
 Return only the JSON response:
         """
+
+def categorize_transactions(transactions):
+    """Use AI to categorize transactions"""
+    prompt = CATEGORIZE_PROMPT_PREFIX + app.json.dumps(transactions[:20]) + CATEGORIZE_PROMPT_SUFFIX
     
     try:
-        model = genai.GenerativeModel('gemini-2.5-flash')
+        model = get_gemini_model()
         response = model.generate_content(prompt)
         
-        import json
-        response_text = response.text.strip()
-        if response_text.startswith('```json'):
-            response_text = response_text[7:]
-        if response_text.startswith('```'):
-            response_text = response_text[3:]
-        if response_text.endswith('```'):
-            response_text = response_text[:-3]
-        
-        result = json.loads(response_text.strip())
+        result = app.json.loads(strip_code_fence(response.text))
         return result
         
     except Exception as e:
-        print(f"Error categorizing: {e}")
+        logger.exception("Error categorizing: %s", e)
         return {'categorized_transactions': []}
 
+# Categorization runs off the request path: handlers queue uncached transactions
+# and a single worker categorizes them in batches into CATEGORY_CACHE
+CATEGORIZE_BATCH_MAX = 20
+CATEGORIZE_RETRY_AFTER = 5 * 60  # seconds before a failed key is queued again
+_CATEGORIZE_QUEUE = queue.Queue()
+_CATEGORIZE_PENDING = set()  # cache keys queued or being categorized
+_CATEGORIZE_FAILED = {}  # cache key -> time after which it may be retried
+_categorizer = None
+_CATEGORIZER_LOCK = threading.Lock()
+
+def _run_categorize_batch(batch):
+    """Categorize a batch of (cache key, transaction) pairs into CATEGORY_CACHE"""
+    try:
+        response = categorize_transactions([transaction for _, transaction in batch])
+        by_id = {t.get('_id'): t.get('category') for t in response.get('categorized_transactions', [])}
+    except Exception as e:
+        logger.exception("Background categorization failed: %s", e)
+        by_id = {}
+    
+    with _CATEGORIZER_LOCK:
+        for key, transaction in batch:
+            category = by_id.get(transaction.get('_id'))
+            if category:
+                CATEGORY_CACHE[key] = category
+            else:
+                # Back off instead of re-queuing the key on every poll
+                _CATEGORIZE_FAILED[key] = time.time() + CATEGORIZE_RETRY_AFTER
+            _CATEGORIZE_PENDING.discard(key)
+        while len(CATEGORY_CACHE) > CATEGORY_CACHE_MAX:
+            CATEGORY_CACHE.popitem(last=False)
+        while len(_CATEGORIZE_FAILED) > CATEGORY_CACHE_MAX:
+            del _CATEGORIZE_FAILED[next(iter(_CATEGORIZE_FAILED))]
+
+def _categorize_loop():
+    while True:
+        batch = [_CATEGORIZE_QUEUE.get()]
+        while len(batch) < CATEGORIZE_BATCH_MAX:
+            try:
+                batch.append(_CATEGORIZE_QUEUE.get_nowait())
+            except queue.Empty:
+                break
+        _run_categorize_batch(batch)
+
+def queue_categorization(transactions):
+    """Queue transactions for background AI categorization, skipping ones already queued
+    or that failed within the last CATEGORIZE_RETRY_AFTER seconds"""
+    global _categorizer
+    if not transactions:
+        return
+    
+    now = time.time()
+    with _CATEGORIZER_LOCK:
+        if _categorizer is None:
+            _categorizer = threading.Thread(target=_categorize_loop, name='categorizer', daemon=True)
+            _categorizer.start()
+        for transaction in transactions:
+            key = _category_cache_key(transaction)
+            if key in _CATEGORIZE_PENDING or key in CATEGORY_CACHE:
+                continue
+            retry_at = _CATEGORIZE_FAILED.get(key)
+            if retry_at is not None:
+                if retry_at > now:
+                    continue
+                del _CATEGORIZE_FAILED[key]
+            _CATEGORIZE_PENDING.add(key)
+            # Queue a copy; the handler goes on to modify the original
+            _CATEGORIZE_QUEUE.put((key, dict(transaction)))
+
 # ========== Simple Transactions Endpoint ==========
 @app.route('/get-transactions', methods=['GET'])
 def get_transactions():
@@ -1777,58 +2623,27 @@ def get_transactions():
         
         # Try to get data from Plaid
         try:
-            access_token = get_or_create_sandbox_token()
-            
-            # Get transactions from Plaid
-            cursor = PLAID_TRANSACTION_CURSORS.get('default', '')
-            all_plaid_transactions = []
-            has_more = True
-            
-            while has_more:
-                sync_request = TransactionsSyncRequest(
-                    access_token=access_token,
-                    cursor=cursor if cursor else None
-                )
-                sync_response = plaid_client.transactions_sync(sync_request)
-                
-                for trans in sync_response['added']:
-                    all_plaid_transactions.append({
-                        'transaction_id': trans['transaction_id'],
-                        'account_id': trans['account_id'],
-                        'date': trans['date'],
-                        'name': trans['name'],
-                        'merchant_name': trans.get('merchant_name'),
-                        'amount': trans['amount'],
-                        'category': trans.get('category', []),
-                        'pending': trans['pending']
-                    })
-                
-                cursor = sync_response['next_cursor']
-                has_more = sync_response['has_more']
-                
-                if len(all_plaid_transactions) > 100:
-                    break
-            
-            PLAID_TRANSACTION_CURSORS['default'] = cursor
-            
-            # Transform to legacy format
-            transactions = [transform_plaid_transaction_to_legacy(t) for t in all_plaid_transactions]
+            # Get transactions from the shared Plaid snapshot in legacy format
+            _, plaid_transactions = _get_plaid_snapshot()
+            source_transactions = (transform_plaid_transaction_to_legacy(t) for t in plaid_transactions[:100])
             
         except plaid.ApiException as e:
-            logger.warning(f"Plaid API error, using mock transactions: {e}")
-            transactions = generate_realistic_transactions(30, [])
+            logger.warning("Plaid API error, using mock transactions: %s", e)
+            source_transactions = generate_realistic_transactions(30, [])
         except Exception as e:
-            logger.warning(f"Error getting Plaid data: {e}")
-            transactions = generate_realistic_transactions(30, [])
+            logger.warning("Error getting Plaid data: %s", e)
+            source_transactions = generate_realistic_transactions(30, [])
         
-        # Apply updates
-        for transaction in transactions:
+        # Apply updates and filter out deleted in a single pass
+        transaction_updates, deleted_ids = load_transaction_updates()
+        for transaction in source_transactions:
             trans_id = transaction.get('_id')
-            if trans_id in TRANSACTION_UPDATES:
-                transaction.update(TRANSACTION_UPDATES[trans_id])
-        
-        # Filter out deleted
-        transactions = [t for t in transactions if not t.get('deleted', False)]
+            if trans_id in deleted_ids:
+                continue
+            updates = transaction_updates.get(trans_id)
+            if updates:
+                transaction.update(updates)
+            transactions.append(transaction)
         
         return jsonify(transactions)
         
@@ -1851,39 +2666,8 @@ def get_transaction_history():
         # Try to use Plaid API first, fallback to mock data
         if use_plaid:
             try:
-                access_token = get_or_create_sandbox_token()
-                
-                # Get transactions from Plaid
-                cursor = PLAID_TRANSACTION_CURSORS.get('default', '')
-                all_plaid_transactions = []
-                has_more = True
-                
-                while has_more:
-                    sync_request = TransactionsSyncRequest(
-                        access_token=access_token,
-                        cursor=cursor if cursor else None
-                    )
-                    sync_response = plaid_client.transactions_sync(sync_request)
-                    
-                    for trans in sync_response['added']:
-                        all_plaid_transactions.append({
-                            'transaction_id': trans['transaction_id'],
-                            'account_id': trans['account_id'],
-                            'date': trans['date'],
-                            'name': trans['name'],
-                            'merchant_name': trans.get('merchant_name'),
-                            'amount': trans['amount'],
-                            'category': trans.get('category', []),
-                            'pending': trans['pending']
-                        })
-                    
-                    cursor = sync_response['next_cursor']
-                    has_more = sync_response['has_more']
-                    
-                    if len(all_plaid_transactions) > 500:
-                        break
-                
-                PLAID_TRANSACTION_CURSORS['default'] = cursor
+                # Get transactions from the shared Plaid snapshot
+                _, all_plaid_transactions = _get_plaid_snapshot()
                 
                 # Transform Plaid data to our format
                 for idx, t in enumerate(all_plaid_transactions):
@@ -1905,10 +2689,10 @@ def get_transaction_history():
                 source = 'plaid'
                 
             except plaid.ApiException as e:
-                logger.warning(f"Plaid API error: {e}")
+                logger.warning("Plaid API error: %s", e)
                 # Fall through to mock data
             except Exception as e:
-                logger.warning(f"Error getting Plaid data: {e}")
+                logger.warning("Error getting Plaid data: %s", e)
                 # Fall through to mock data
         
         # If no Plaid transactions, generate mock data
@@ -1926,13 +2710,15 @@ def get_transaction_history():
                 })
             source = 'mock'
         
-        # Sort by date (newest first)
-        transformed_transactions.sort(key=lambda x: x['date'], reverse=True)
-        
-        # Apply pagination
+        # Apply pagination, newest first
         start_idx = (page - 1) * limit
         end_idx = start_idx + limit
-        paginated_transactions = transformed_transactions[start_idx:end_idx]
+        if 0 <= start_idx and end_idx < len(transformed_transactions) // 4:
+            # Early pages only need the top end_idx rows, not a full sort
+            paginated_transactions = nlargest(end_idx, transformed_transactions, key=itemgetter('date'))[start_idx:]
+        else:
+            transformed_transactions.sort(key=itemgetter('date'), reverse=True)
+            paginated_transactions = transformed_transactions[start_idx:end_idx]
         
         return jsonify({
             'transactions': paginated_transactions,
@@ -1943,62 +2729,69 @@ def get_transaction_history():
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
+# Keyword rules for simple categorization, checked in order; first match wins
+SIMPLE_CATEGORY_RULES = (
+    ('food', ('starbucks', 'coffee', 'restaurant', 'food', 'grocery', 'whole foods', 'chipotle')),
+    ('transport', ('uber', 'lyft', 'gas', 'parking', 'transport')),
+    ('entertainment', ('netflix', 'spotify', 'movie', 'entertainment')),
+    ('shopping', ('amazon', 'target', 'shopping', 'store')),
+    ('utilities', ('electric', 'phone', 'bill', 'utility')),
+    ('healthcare', ('pharmacy', 'medical', 'health', 'gym')),
+    ('income', ('salary', 'deposit', 'income', 'payroll')),
+)
+
+SIMPLE_CATEGORY_PATTERNS = _compile_category_rules(SIMPLE_CATEGORY_RULES)
+
+@lru_cache(maxsize=4096)
 def categorize_transaction_simple(description):
     """Simple categorization based on transaction description"""
-    desc = description.lower()
-    
-    if any(word in desc for word in ['starbucks', 'coffee', 'restaurant', 'food', 'grocery', 'whole foods', 'chipotle']):
-        return 'food'
-    elif any(word in desc for word in ['uber', 'lyft', 'gas', 'parking', 'transport']):
-        return 'transport'
-    elif any(word in desc for word in ['netflix', 'spotify', 'movie', 'entertainment']):
-        return 'entertainment'
-    elif any(word in desc for word in ['amazon', 'target', 'shopping', 'store']):
-        return 'shopping'
-    elif any(word in desc for word in ['electric', 'phone', 'bill', 'utility']):
-        return 'utilities'
-    elif any(word in desc for word in ['pharmacy', 'medical', 'health', 'gym']):
-        return 'healthcare'
-    elif any(word in desc for word in ['salary', 'deposit', 'income', 'payroll']):
-        return 'income'
-    else:
-        return 'other'
+    return _categorize_lower(description.lower())
+
+def _categorize_lower(desc):
+    """Match an already-lowercased description against SIMPLE_CATEGORY_RULES"""
+    for category, pattern in SIMPLE_CATEGORY_PATTERNS:
+        if pattern.search(desc):
+            return category
+    
+    return 'other'
 
 # ========== AI Summary Endpoint ==========
-@app.route('/get-ai-summary', methods=['POST'])
-def get_ai_summary():
-    try:
-        data = request.get_json()
-        transactions = data.get('transactions', [])
-        
-        if not transactions:
-            return jsonify({'error': 'No transactions provided'}), 400
-        
-        # Initialize Gemini model
-        model = genai.GenerativeModel('gemini-2.5-flash')
-        
-        # Create the prompt
-        prompt = f"""You are an expert financial analyst specializing in transaction categorization and spending pattern analysis.
+AI_SUMMARY_PROMPT_PREFIX = """You are an expert financial analyst specializing in transaction categorization and spending pattern analysis.
 
 Analyze these bank transactions and return ONLY a valid JSON object with this exact structure:
 
-{{
+{
   "categorized_transactions": [
-    {{
+    {
       "_id": "transaction_id",
       "amount": 25.50,
       "description": "Coffee at Starbucks",
       "purchase_date": "2024-10-15",
       "category": "Food & Drink"
-    }}
+    }
   ],
   "summary": "Brief 2-3 sentence summary of spending habits and saving tip"
-}}
+}
 
 Categories: Food & Drink, Shopping, Transport, Bills & Utilities, Entertainment, Groceries, General Merchandise, Income, Other
 
 Transactions to analyze:
-{transactions}"""
+"""
+
+@app.route('/get-ai-summary', methods=['POST'])
+def get_ai_summary():
+    try:
+        data = request.get_json()
+        transactions = data.get('transactions', [])
+        
+        if not transactions:
+            return jsonify({'error': 'No transactions provided'}), 400
+        
+        # Initialize Gemini model
+        model = get_gemini_model()
+        
+        # Create the prompt
+        prompt = AI_SUMMARY_PROMPT_PREFIX + app.json.dumps(transactions)
         
         # Send to Gemini API
         response = model.generate_content(prompt)
@@ -2008,26 +2801,18 @@ Transactions to analyze:
             import json
             
             # Clean the response text - remove markdown code blocks if present
-            response_text = response.text.strip()
-            if response_text.startswith('```json'):
-                response_text = response_text[7:]
-            if response_text.startswith('```'):
-                response_text = response_text[3:]
-            if response_text.endswith('```'):
-                response_text = response_text[:-3]
-            
-            response_text = response_text.strip()
-            result = json.loads(response_text)
+            response_text = strip_code_fence(response.text)
+            result = app.json.loads(response_text)
         except json.JSONDecodeError as e:
-            print(f"JSON decode error: {e}")
-            print(f"Cleaned response text: {response_text}")
+            logger.error("JSON decode error: %s", e)
+            logger.error("Cleaned response text: %s", response_text)
             result = {
                 'categorized_transactions': transactions,
                 'summary': 'Unable to analyze transactions at this time.'
             }
         except Exception as e:
-            print(f"Error parsing Gemini response: {e}")
-            print(f"Response text: {response.text}")
+            logger.error("Error parsing Gemini response: %s", e)
+            logger.error("Response text: %s", response.text)
             result = {
                 'categorized_transactions': transactions,
                 'summary': 'Unable to analyze transactions at this time.'
@@ -2044,29 +2829,28 @@ def detect_recurring_charges(transactions):
     recurring = []
     merchants = {}
     
+    # Group the transactions themselves so matches can be marked without a rescan
     for t in transactions:
-        merchant = t.get('description', '').lower()
-        amount = t.get('amount', 0)
-        
-        if merchant not in merchants:
-            merchants[merchant] = []
-        merchants[merchant].append({'amount': amount, 'date': t.get('purchase_date', t.get('transaction_date', ''))})
+        merchant = (t.get('description') or '').lower()
+        merchants.setdefault(merchant, []).append(t)
     
     # Check for recurring patterns
     for merchant, charges in merchants.items():
         if len(charges) >= 2:
-            amounts = [c['amount'] for c in charges]
+            amounts = [c.get('amount', 0) for c in charges]
             avg_amount = sum(amounts) / len(amounts)
             
-            # Check if amounts are similar (±15%)
-            is_similar = all(abs(amt - avg_amount) / avg_amount <= 0.15 for amt in amounts if avg_amount > 0)
+            # Check if amounts are similar (±15%); the extremes deviate the most
+            is_similar = avg_amount <= 0 or (
+                (max(amounts) - avg_amount) / avg_amount <= 0.15 and
+                (avg_amount - min(amounts)) / avg_amount <= 0.15
+            )
             
             if is_similar and avg_amount > 50:  # Likely a bill
                 # Mark as recurring
-                for t in transactions:
-                    if t.get('description', '').lower() == merchant:
-                        t['isFixed'] = True
-                        recurring.append(t)
+                for t in charges:
+                    t['isFixed'] = True
+                    recurring.append(t)
     
     return recurring
 
@@ -2076,11 +2860,14 @@ def simple_linear_regression(days, amounts):
         return 0.0, 0.0
 
     n = len(days)
-    x_mean = sum(days) / n
-    y_mean = sum(amounts) / n
+    sum_x = sum(days)
+    sum_y = sum(amounts)
+    x_mean = sum_x / n
+    y_mean = sum_y / n
 
-    numerator = sum((x - x_mean) * (y - y_mean) for x, y in zip(days, amounts))
-    denominator = sum((x - x_mean) ** 2 for x in days)
+    # Centered sums from raw sums; map(mul) keeps the loops in C
+    numerator = sum(map(mul, days, amounts)) - sum_x * y_mean
+    denominator = sum(map(mul, days, days)) - sum_x * x_mean
 
     if denominator == 0:
         return 0.0, y_mean
@@ -2090,6 +2877,14 @@ def simple_linear_regression(days, amounts):
 
     return slope, intercept
 
+def predict_daily_spend(days, amounts, today, days_in_month):
+    """Fit a spending trend and predict each remaining day of the month"""
+    slope, intercept = simple_linear_regression(days, amounts)
+    return {
+        day: round(max(0, slope * day + intercept), 2)
+        for day in range(today + 1, days_in_month + 1)
+    }
+
 @app.route('/api/plaid/monthly-transactions', methods=['POST'])
 @app.route('/api/nessie/transactions', methods=['POST'])  # Keep old route for backward compatibility
 def get_monthly_transactions():
@@ -2103,57 +2898,32 @@ def get_monthly_transactions():
         
         # Try to get data from Plaid
         try:
-            access_token = get_or_create_sandbox_token()
-            
-            # Get transactions from Plaid
-            cursor = PLAID_TRANSACTION_CURSORS.get('default', '')
-            all_plaid_transactions = []
-            has_more = True
-            
-            while has_more:
-                sync_request = TransactionsSyncRequest(
-                    access_token=access_token,
-                    cursor=cursor if cursor else None
-                )
-                sync_response = plaid_client.transactions_sync(sync_request)
-                
-                for trans in sync_response['added']:
-                    all_plaid_transactions.append(trans)
-                
-                cursor = sync_response['next_cursor']
-                has_more = sync_response['has_more']
-                
-                if len(all_plaid_transactions) > 500:
-                    break
-            
-            PLAID_TRANSACTION_CURSORS['default'] = cursor
+            # Get transactions from the shared Plaid snapshot
+            _, all_plaid_transactions = _get_plaid_snapshot()
             
             # Normalize transactions and filter by month/year
             for t in all_plaid_transactions:
                 trans_date = str(t.get('date', ''))
-                if trans_date:
-                    try:
-                        trans_month = int(trans_date.split('-')[1])
-                        trans_year = int(trans_date.split('-')[0])
-                        
-                        # Filter to requested month (or include all if not specified)
-                        if (not month or trans_month == month) and (not year or trans_year == year):
-                            transactions.append({
-                                'id': t.get('transaction_id', ''),
-                                'date': trans_date,
-                                'amount': abs(t.get('amount', 0)),
-                                'merchant': t.get('merchant_name') or t.get('name', 'Unknown'),
-                                'description': t.get('name', 'Purchase'),
-                                'type': 'credit' if t.get('amount', 0) < 0 else 'debit'
-                            })
-                    except (ValueError, IndexError):
-                        pass
+                parts = _ymd_parts(trans_date)
+                if parts:
+                    trans_year, trans_month, _ = parts
+                    
+                    # Filter to requested month (or include all if not specified)
+                    if (not month or trans_month == month) and (not year or trans_year == year):
+                        transactions.append({
+                            'id': t.get('transaction_id', ''),
+                            'date': trans_date,
+                            'amount': abs(t.get('amount', 0)),
+                            'merchant': t.get('merchant_name') or t.get('name', 'Unknown'),
+                            'description': t.get('name', 'Purchase'),
+                            'type': 'credit' if t.get('amount', 0) < 0 else 'debit'
+                        })
                         
         except plaid.ApiException as e:
-            logger.warning(f"Plaid API error, using mock data: {e}")
+            logger.warning("Plaid API error, using mock data: %s", e)
             transactions = []
         except Exception as e:
-            logger.warning(f"Error getting Plaid data: {e}")
+            logger.warning("Error getting Plaid data: %s", e)
             transactions = []
         
         # If no Plaid transactions, generate mock data
@@ -2161,51 +2931,42 @@ def get_monthly_transactions():
             mock_transactions = generate_realistic_transactions(30, [])
             for t in mock_transactions:
                 trans_date = t.get('purchase_date', '')
-                if trans_date:
-                    try:
-                        trans_month = int(trans_date.split('-')[1])
-                        trans_year = int(trans_date.split('-')[0])
-                        
-                        if (not month or trans_month == month) and (not year or trans_year == year):
-                            transactions.append({
-                                'id': t.get('_id', ''),
-                                'date': trans_date,
-                                'amount': abs(t.get('amount', 0)),
-                                'merchant': t.get('description', 'Unknown'),
-                                'description': t.get('description', 'Purchase'),
-                                'type': 'credit' if t.get('amount', 0) > 0 else 'debit'
-                            })
-                    except (ValueError, IndexError):
-                        pass
-        
-        # Detect recurring charges
+                parts = _ymd_parts(trans_date)
+                if parts:
+                    trans_year, trans_month, _ = parts
+                    
+                    if (not month or trans_month == month) and (not year or trans_year == year):
+                        transactions.append({
+                            'id': t.get('_id', ''),
+                            'date': trans_date,
+                            'amount': abs(t.get('amount', 0)),
+                            'merchant': t.get('description', 'Unknown'),
+                            'description': t.get('description', 'Purchase'),
+                            'type': 'credit' if t.get('amount', 0) > 0 else 'debit'
+                        })
+        
+        # Detect recurring charges (tagged isFixed for the client)
         fixed_charges = detect_recurring_charges(transactions)
+        fixed_ids = frozenset(t['id'] for t in fixed_charges)
         
         # Build daily spending for regression (exclude fixed charges)
         today = datetime.now().day
-        daily_spend = {}
+        
+        # One slot per day of the month; None marks days without spending
+        daily_spend = [None] * (today + 1)
         
         for t in transactions:
-            try:
-                day = int(t['date'].split('-')[2])
-                if day <= today:
-                    if not t.get('isFixed'):
-                        daily_spend[day] = daily_spend.get(day, 0) + t['amount']
-            except (ValueError, IndexError):
-                pass
+            parts = _ymd_parts(t['date'])
+            if parts and parts[2] <= today and t['id'] not in fixed_ids:
+                daily_spend[parts[2]] = (daily_spend[parts[2]] or 0) + t['amount']
         
         # Run regression
-        days = sorted(daily_spend.keys())
-        amounts = [daily_spend[d] for d in days]
-        
-        slope, intercept = simple_linear_regression(days, amounts)
+        days = [day for day, spend in enumerate(daily_spend) if spend is not None]
+        amounts = [daily_spend[day] for day in days]
         
         # Predict future days
-        predictions = {}
         days_in_month = 31  # Simplified
-        for day in range(today + 1, days_in_month + 1):
-            predicted = max(0, slope * day + intercept)
-            predictions[day] = round(predicted, 2)
+        predictions = predict_daily_spend(days, amounts, today, days_in_month)
         
         return jsonify({
             'transactions': transactions,
@@ -2226,7 +2987,7 @@ def get_budget_advice():
     except:
         pass
     
-    model = genai.GenerativeModel('gemini-2.5-flash')
+    model = get_gemini_model()
     
     prompt = f"""You are a certified financial planner (CFP) with expertise in personal budgeting and money management.
 
@@ -2389,26 +3150,9 @@ if INVESTMENT_FEATURES_AVAILABLE:
         except Exception as e:
             return jsonify({'error': str(e)}), 500
 
-@app.route('/chat/financial-advice', methods=['POST'])
-def chat_financial_advice():
-    try:
-        data = request.get_json()
-        message = data.get('message', '')
-        advisor = data.get('advisor', 'warren_buffett')
-
-        if not message:
-            return jsonify({'error': 'Message is required'}), 400
-
-        # Try to initialize Gemini model; if it fails, fall back to a safe offline path
-        model = None
-        try:
-            model = genai.GenerativeModel('gemini-2.5-flash')
-        except Exception as e:
-            logger.warning(f'Gemini model initialization failed: {e}')
-
-        # Define comprehensive advisor personas
-        advisor_personas = {
-            'warren_buffett': """You are Warren Buffett, the legendary value investor and CEO of Berkshire Hathaway.
+# Advisor personas for the investment chat, keyed by advisor id
+ADVISOR_PERSONAS = {
+    'warren_buffett': """You are Warren Buffett, the legendary value investor and CEO of Berkshire Hathaway.
 
 PERSONALITY & STYLE:
 - Use folksy, down-to-earth wisdom and Midwestern common sense
@@ -2436,8 +3180,8 @@ APPROACH:
 - Mention the value of patience and emotional discipline
 
 Remember: You're giving investment perspective and education, not specific buy/sell recommendations.""",
-            
-            'peter_lynch': """You are Peter Lynch, the legendary former manager of Fidelity's Magellan Fund.
+    
+    'peter_lynch': """You are Peter Lynch, the legendary former manager of Fidelity's Magellan Fund.
 
 PERSONALITY & STYLE:
 - Energetic, practical, and optimistic about investing
@@ -2472,8 +3216,8 @@ APPROACH:
 - Use practical examples from consumer products and services
 
 Remember: Make investing feel accessible and achievable for regular people.""",
-            
-            'cathie_wood': """You are Cathie Wood, founder and CEO of ARK Invest, known for your bold conviction in disruptive innovation.
+    
+    'cathie_wood': """You are Cathie Wood, founder and CEO of ARK Invest, known for your bold conviction in disruptive innovation.
 
 PERSONALITY & STYLE:
 - Passionate about innovation and technological transformation
@@ -2518,48 +3262,185 @@ APPROACH:
 - Connect multiple innovation themes together
 
 Remember: Focus on the science and data behind innovations, and help investors understand transformative potential."""
-        }
-        
-        persona = advisor_personas.get(advisor, advisor_personas['warren_buffett'])
-
-        prompt = f"""{persona}
+}
 
-USER QUESTION:
-{message}
+ADVISOR_RESPONSE_GUIDELINES = """
 
 RESPONSE GUIDELINES:
-1. Stay in character as {advisor.replace('_', ' ').title()}
+1. Stay in character as {advisor_name}
 2. Draw on your specific investment philosophy and experience
 3. Provide educational insights rather than specific buy/sell recommendations
 4. Use examples and analogies characteristic of your style
 5. Be helpful, thoughtful, and authentic to your perspective
 6. Keep response conversational and under 300 words
 7. If discussing specific companies, focus on business analysis not price targets
-
-Provide your response now:
 """
 
+# Offline replies used when Gemini is unavailable; {snip} is the start of the question
+ADVISOR_FALLBACK_TEMPLATES = {
+    'warren_buffett': "The Oracle of Omaha says: {snip}... sounds like a question about {first}. My advice: focus on businesses you understand, buy quality companies at fair prices, and think long-term. Remember - time in the market beats timing the market.",
+    'peter_lynch': "Peter Lynch perspective: {snip}... reminds me of finding investment opportunities in everyday life. Look for companies whose products you use and understand. If you can explain the business to a 10-year-old, it might be worth investigating further.",
+    'cathie_wood': "Innovation perspective: {snip}... suggests we should consider disruptive technologies and exponential growth curves. Focus on companies positioned to benefit from AI, genomics, robotics, and other transformative platforms over the next 5-10 years."
+}
+
+# Reject oversized inputs before building prompts around them
+MAX_CHAT_MESSAGE_CHARS = 4000
+MAX_INSIGHT_TRANSACTION_CHARS = 2000
+
+# ~300 words of reply; caps decode time on runaway generations
+ADVISOR_GENERATION_CONFIG = {
+    'max_output_tokens': 450,
+    'temperature': 0.7,
+    'top_p': 0.9,
+    'candidate_count': 1
+}
+
+# Upload each advisor's system instruction once as Gemini cached content (opt-in; the
+# API rejects caches below its minimum token count, which falls back to a plain model)
+ADVISOR_CONTEXT_CACHE_ENABLED = os.getenv('GEMINI_CONTEXT_CACHE', 'false').lower() == 'true'
+ADVISOR_CONTEXT_CACHE_TTL = timedelta(hours=1)
+_ADVISOR_CONTEXT_CACHES = {}  # advisor -> (refresh_at, model)
+
+def _advisor_key(advisor):
+    """Map a requested advisor to a known ADVISOR_PERSONAS key, defaulting like the persona lookup"""
+    return advisor if isinstance(advisor, str) and advisor in ADVISOR_PERSONAS else 'warren_buffett'
+
+@lru_cache(maxsize=64)
+def _advisor_system_instruction(advisor):
+    """Persona plus response guidelines: everything in the prompt except the question"""
+    persona = ADVISOR_PERSONAS.get(advisor, ADVISOR_PERSONAS['warren_buffett'])
+    return persona + ADVISOR_RESPONSE_GUIDELINES.format(advisor_name=advisor.replace('_', ' ').title())
+
+@lru_cache(maxsize=64)
+def _advisor_model(advisor):
+    return genai.GenerativeModel('gemini-2.5-flash', system_instruction=_advisor_system_instruction(advisor))
+
+def get_advisor_model(advisor):
+    """Return a Gemini model whose system instruction is the advisor's fixed prompt prefix"""
+    # Only known personas get a model or a (billable) context cache upload
+    advisor = _advisor_key(advisor)
+    if ADVISOR_CONTEXT_CACHE_ENABLED:
+        entry = _ADVISOR_CONTEXT_CACHES.get(advisor)
+        if entry is not None and entry[0] > datetime.now():
+            return entry[1]
+        try:
+            cached_content = genai.caching.CachedContent.create(
+                model='models/gemini-2.5-flash',
+                system_instruction=_advisor_system_instruction(advisor),
+                ttl=ADVISOR_CONTEXT_CACHE_TTL
+            )
+            model = genai.GenerativeModel.from_cached_content(cached_content=cached_content)
+            # Recreate a little before the server-side cache expires
+            _ADVISOR_CONTEXT_CACHES[advisor] = (datetime.now() + ADVISOR_CONTEXT_CACHE_TTL - timedelta(minutes=5), model)
+            return model
+        except Exception as e:
+            logger.warning('Gemini context cache unavailable for %s: %s', advisor, e)
+            # Don't retry the upload on every request; try again after one TTL
+            _ADVISOR_CONTEXT_CACHES[advisor] = (datetime.now() + ADVISOR_CONTEXT_CACHE_TTL, _advisor_model(advisor))
+    return _advisor_model(advisor)
+
+def _text_event_stream(pieces, on_complete=None, **done_fields):
+    """Server-Sent Events for a generated reply: one 'delta' event per text piece, then 'done'"""
+    parts = []
+    try:
+        for text in pieces:
+            parts.append(text)
+            yield f"data: {app.json.dumps({'delta': text})}\n\n"
+    except Exception as e:
+        logger.exception("Gemini streaming failed: %s", e)
+        yield f"event: error\ndata: {app.json.dumps({'error': str(e)})}\n\n"
+        return
+    if on_complete is not None:
+        on_complete(''.join(parts))
+    yield f"data: {app.json.dumps({'done': True, **done_fields})}\n\n"
+
+def _sse_response(events):
+    response = Response(events, mimetype='text/event-stream')
+    response.headers['Cache-Control'] = 'no-cache'
+    response.headers['X-Accel-Buffering'] = 'no'
+    return response
+
+@app.route('/chat/financial-advice', methods=['POST'])
+def chat_financial_advice():
+    try:
+        data = request.get_json()
+        message = data.get('message', '')
+        advisor = data.get('advisor', 'warren_buffett')
+        # Unknown advisors share the default persona's model and cache entries
+        advisor_key = _advisor_key(advisor)
+        # Clients opt in to token streaming with {"stream": true} or Accept: text/event-stream
+        stream = bool(data.get('stream')) or 'text/event-stream' in request.headers.get('Accept', '')
+
+        if not message or message.isspace():
+            return jsonify({'error': 'Message is required'}), 400
+        if len(message) > MAX_CHAT_MESSAGE_CHARS:
+            return jsonify({'error': 'Message too long'}), 413
+
+        # Try to initialize Gemini model; if it fails, fall back to a safe offline path
+        model = None
+        try:
+            model = get_advisor_model(advisor_key)
+        except Exception as e:
+            logger.warning('Gemini model initialization failed: %s', e)
+
+        # Persona and guidelines live in the model's system instruction, so every request
+        # shares the same prefix (implicitly cached by Gemini) and the turn is just the question
+        prompt = message
+
+        # Serve repeated (exact first, then paraphrased) questions from the cache
+        semantic_cache = get_semantic_cache()
+        cache_namespace = f'chat:{advisor_key}'
+        cache_text = message.strip().lower()
+        exact_key = f'{cache_namespace}:{cache_text}'
+        cached_reply = exact_cache_get(exact_key)
+        if cached_reply is None and semantic_cache:
+            cached_reply = semantic_cache.get(cache_namespace, cache_text)
+        if cached_reply is not None:
+            if stream:
+                response = _sse_response(_text_event_stream([cached_reply], advisor=advisor))
+                response.headers['X-Cache'] = 'HIT'
+                return response
+            response = jsonify({
+                'response': cached_reply,
+                'advisor': advisor
+            })
+            response.headers['X-Cache'] = 'HIT'
+            return response
+
         # If model is available, try to generate a response. If generation fails or model
         # is unavailable, return a safe fallback response instead of raising a 500.
         if model is not None:
             try:
-                response = model.generate_content(prompt)
-                return jsonify({
+                if stream:
+                    def cache_reply(text):
+                        exact_cache_set(exact_key, text, CHAT_CACHE_TTL)
+                        if semantic_cache:
+                            semantic_cache.put(cache_namespace, cache_text, text)
+                    
+                    chunks = model.generate_content(prompt, generation_config=ADVISOR_GENERATION_CONFIG, stream=True)
+                    pieces = (chunk.text for chunk in chunks)
+                    result = _sse_response(_text_event_stream(pieces, on_complete=cache_reply, advisor=advisor))
+                    result.headers['X-Cache'] = 'MISS'
+                    return result
+                
+                response = model.generate_content(prompt, generation_config=ADVISOR_GENERATION_CONFIG)
+                exact_cache_set(exact_key, response.text, CHAT_CACHE_TTL)
+                if semantic_cache:
+                    semantic_cache.put(cache_namespace, cache_text, response.text)
+                result = jsonify({
                     'response': response.text,
                     'advisor': advisor
                 })
+                result.headers['X-Cache'] = 'MISS'
+                return result
             except Exception as e:
-                logger.error(f"Gemini generation failed: {e}")
+                logger.error("Gemini generation failed: %s", e)
 
         # Fallback: generate a short, deterministic advisor-style reply so the frontend
         # receives a usable response even when Gemini is down.
-        advisor_fallbacks = {
-            'warren_buffett': f"The Oracle of Omaha says: {message[:50]}... sounds like a question about {message.split()[0] if message.split() else 'investing'}. My advice: focus on businesses you understand, buy quality companies at fair prices, and think long-term. Remember - time in the market beats timing the market.",
-            'peter_lynch': f"Peter Lynch perspective: {message[:50]}... reminds me of finding investment opportunities in everyday life. Look for companies whose products you use and understand. If you can explain the business to a 10-year-old, it might be worth investigating further.",
-            'cathie_wood': f"Innovation perspective: {message[:50]}... suggests we should consider disruptive technologies and exponential growth curves. Focus on companies positioned to benefit from AI, genomics, robotics, and other transformative platforms over the next 5-10 years."
-        }
-        
-        fallback_reply = advisor_fallbacks.get(advisor, advisor_fallbacks['warren_buffett'])
+        words = message.split(maxsplit=1)
+        template = ADVISOR_FALLBACK_TEMPLATES.get(advisor, ADVISOR_FALLBACK_TEMPLATES['warren_buffett'])
+        fallback_reply = template.format(snip=message[:50], first=words[0] if words else 'investing')
 
         return jsonify({
             'response': fallback_reply,
@@ -2568,9 +3449,102 @@ Provide your response now:
         })
 
     except Exception as e:
-        logger.error(f"Error in chat endpoint: {e}")
+        logger.exception("Error in chat endpoint: %s", e)
         return jsonify({'error': f'Failed to generate response: {str(e)}'}), 500
     
+# Gemini returns schema-validated JSON for insights, so no fence stripping or fallbacks.
+# Concurrent insight requests are coalesced into one call that returns an array.
+INSIGHT_GENERATION_CONFIG = {
+    'response_mime_type': 'application/json',
+    'response_schema': {
+        'type': 'array',
+        'items': {
+            'type': 'object',
+            'properties': {
+                'index': {'type': 'integer'},
+                'insight': {'type': 'string'},
+                'advice': {'type': 'string'}
+            },
+            'required': ['index', 'insight', 'advice']
+        }
+    }
+}
+
+INSIGHT_PROMPT_PREFIX = """
+Analyze each of the following transactions and provide a brief, two-sentence financial insight for each.
+Focus on the spending pattern and offer a piece of actionable advice.
+
+Transactions:
+"""
+
+INSIGHT_PROMPT_SUFFIX = """
+Respond with one item per transaction, using its number as "index", with "insight" and "advice".
+"""
+
+INSIGHT_MAX_OUTPUT_TOKENS = 120  # per transaction in the batch
+INSIGHT_BATCH_MAX = 16
+INSIGHT_BATCH_WINDOW = 0.03  # seconds to wait for more requests before flushing a batch
+INSIGHT_BATCH_TIMEOUT = 60
+_INSIGHT_QUEUE = queue.Queue()
+_insight_batcher = None
+_INSIGHT_BATCHER_LOCK = threading.Lock()
+
+def _run_insight_batch(batch):
+    """Ask Gemini for insights on every (transaction, future) in the batch with a single call"""
+    try:
+        lines = [f"{i}. {transaction}" for i, (transaction, _) in enumerate(batch)]
+        prompt = INSIGHT_PROMPT_PREFIX + '\n'.join(lines) + INSIGHT_PROMPT_SUFFIX
+        generation_config = dict(INSIGHT_GENERATION_CONFIG, max_output_tokens=INSIGHT_MAX_OUTPUT_TOKENS * len(batch))
+        response = get_gemini_model().generate_content(prompt, generation_config=generation_config)
+        by_index = {item.pop('index'): item for item in app.json.loads(response.text)}
+        for i, (_, future) in enumerate(batch):
+            if i in by_index:
+                future.set_result(by_index[i])
+            else:
+                future.set_exception(ValueError('Insight missing from batched response'))
+    except Exception as e:
+        logger.exception("Batched insight generation failed: %s", e)
+        for _, future in batch:
+            if not future.done():
+                future.set_exception(e)
+
+def _insight_batch_loop():
+    while True:
+        batch = [_INSIGHT_QUEUE.get()]
+        deadline = time.monotonic() + INSIGHT_BATCH_WINDOW
+        while len(batch) < INSIGHT_BATCH_MAX:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(_INSIGHT_QUEUE.get(timeout=remaining))
+            except queue.Empty:
+                break
+        _run_insight_batch(batch)
+
+def submit_transaction_insight(transaction):
+    """Queue a transaction for the insight batcher and return a Future for its insight"""
+    global _insight_batcher
+    if _insight_batcher is None:
+        with _INSIGHT_BATCHER_LOCK:
+            if _insight_batcher is None:
+                _insight_batcher = threading.Thread(target=_insight_batch_loop, name='insight-batcher', daemon=True)
+                _insight_batcher.start()
+    future = Future()
+    _INSIGHT_QUEUE.put((transaction, future))
+    return future
+
+def _insight_cache_text(transaction):
+    """Canonical text for a transaction: description, category and a $10 amount bucket"""
+    if not isinstance(transaction, dict):
+        return str(transaction).strip().lower()
+    description = transaction.get('description') or transaction.get('merchant') or transaction.get('name') or ''
+    try:
+        amount_bucket = int(abs(float(transaction.get('amount', 0))) // 10) * 10
+    except (TypeError, ValueError):
+        amount_bucket = 0
+    return f"{str(description).strip().lower()} | {transaction.get('category', '')} | ~${amount_bucket}"
+
 @app.route('/api/transaction-insight', methods=['POST'])
 def get_transaction_insight():
     try:
@@ -2579,44 +3553,56 @@ def get_transaction_insight():
 
         if not transaction_details:
             return jsonify({'error': 'Missing transaction details'}), 400
+        transaction_json = app.json.dumps(transaction_details, sort_keys=True)
+        if len(transaction_json) > MAX_INSIGHT_TRANSACTION_CHARS:
+            return jsonify({'error': 'Transaction details too long'}), 413
+
+        # Identical transactions hit the exact cache; similar ones (same merchant,
+        # category and amount range) share an insight through the semantic cache
+        semantic_cache = get_semantic_cache()
+        exact_key = 'txn:' + transaction_json
+        cache_text = _insight_cache_text(transaction_details)
+        insight_text = exact_cache_get(exact_key)
+        if insight_text is None and semantic_cache:
+            insight_text = semantic_cache.get('transaction_insight', cache_text)
+        cache_status = 'HIT' if insight_text is not None else 'MISS'
+        
+        if insight_text is None:
+            insight = submit_transaction_insight(transaction_details).result(timeout=INSIGHT_BATCH_TIMEOUT)
+            insight_text = app.json.dumps(insight)
+            exact_cache_set(exact_key, insight_text, INSIGHT_CACHE_TTL)
+            if semantic_cache:
+                semantic_cache.put('transaction_insight', cache_text, insight_text)
+        
+        # insight_text is already a JSON object, so send it without decoding and re-encoding
+        result = app.response_class(insight_text, mimetype=app.json.mimetype)
+        result.headers['X-Cache'] = cache_status
+        return result
 
-        model = genai.GenerativeModel('gemini-2.5-flash')
-        
-        prompt = f"""
-        Analyze the following transaction and provide a brief, two-sentence financial insight. 
-        Focus on the spending pattern and offer a piece of actionable advice.
-
-        Transaction: {transaction_details}
-
-        Format your response as a JSON object with "insight" and "advice" keys.
-        """
-
-        response = model.generate_content(prompt)
-        
-        # A simple way to parse the response, assuming it's in a JSON-like format
-        insight_text = response.text.strip()
-        
-        # Basic parsing, can be improved with regex or more robust logic
-        if '"insight":' in insight_text and '"advice":' in insight_text:
-            import json
-            # Clean markdown code blocks
-            if insight_text.startswith('```json'):
-                insight_text = insight_text[7:]
-            if insight_text.endswith('```'):
-                insight_text = insight_text[:-3]
+    except Exception as e:
+        logger.exception("Error in transaction insight: %s", e)
+        return jsonify({'error': str(e)}), 500
 
-            insight_json = json.loads(insight_text)
-            return jsonify(insight_json)
-        else:
-            # Fallback for non-JSON responses
-            parts = insight_text.split('.')
-            return jsonify({
-                'insight': parts[0] + '.' if parts else "Insight not available.",
-                'advice': parts[1].strip() + '.' if len(parts) > 1 else "Consider reviewing your budget."
-            })
+@app.route('/api/metrics', methods=['GET'])
+def get_cache_metrics():
+    """Report the exact-match response cache hit rate"""
+    try:
+        with _EXACT_CACHE_LOCK:
+            hits = _EXACT_CACHE_STATS['hits']
+            lookups = hits + _EXACT_CACHE_STATS['misses']
+        return jsonify({
+            'response_cache': {
+                'backend': 'redis' if redis_client is not None else 'memory',
+                'hits': hits,
+                'misses': lookups - hits,
+                'hit_rate': round(hits / lookups, 4) if lookups else 0.0,
+                'entries': len(_EXACT_CACHE) if redis_client is None else None
+            },
+            'semantic_cache_enabled': _semantic_cache is not None
+        })
 
     except Exception as e:
-        logger.error(f"Error in transaction insight: {e}")
+        logger.exception("Error getting cache metrics: %s", e)
         return jsonify({'error': str(e)}), 500
 
 
@@ -2688,7 +3674,7 @@ If NO merchants match the query, return:
 
 JSON response:"""
 
-        model = genai.GenerativeModel('gemini-2.5-flash')
+        model = get_gemini_model()
         response = model.generate_content(
             prompt,
             generation_config={
@@ -2698,24 +3684,18 @@ JSON response:"""
         )
         
         response_text = response.text.strip()
-        logger.info(f"LLM filter raw response: {response_text[:200]}")
+        logger.info("LLM filter raw response: %s", response_text[:200])
         
         # Clean markdown if present
-        if '```' in response_text:
-            # Extract JSON from markdown code block
-            import re
-            json_match = re.search(r'```(?:json)?\s*([\s\S]*?)```', response_text)
-            if json_match:
-                response_text = json_match.group(1).strip()
+        response_text = strip_code_fence(response_text)
         
         # Try to extract JSON object if there's extra text
         if not response_text.startswith('{'):
-            import re
-            json_match = re.search(r'\{[\s\S]*\}', response_text)
+            json_match = JSON_OBJECT_RE.search(response_text)
             if json_match:
                 response_text = json_match.group(0)
         
-        result = json.loads(response_text.strip())
+        result = app.json.loads(response_text)
         matching_merchants = result.get('matching_merchants', [])
         reasoning = result.get('reasoning', '')
         
@@ -2728,7 +3708,7 @@ JSON response:"""
                     matching_transactions.append(t)
                     break
         
-        logger.info(f"LLM identified {len(matching_merchants)} matching merchants: {matching_merchants}")
+        logger.info("LLM identified %s matching merchants: %s", len(matching_merchants), matching_merchants)
         
         return {
             'matching_transactions': matching_transactions,
@@ -2737,7 +3717,7 @@ JSON response:"""
         }
         
     except Exception as e:
-        logger.warning(f"LLM transaction filter failed: {e}")
+        logger.warning("LLM transaction filter failed: %s", e)
         # Fallback: Try to find common coffee shop patterns directly
         if 'coffee' in query.lower():
             fallback_matches = []
@@ -2866,9 +3846,8 @@ def execute_structured_query(classification: dict, all_transactions: list) -> di
     elif intent == 'find_recent':
         # Sort ALL transactions by date (most recent first) and return limit
         limit = filters.get('limit', 5)
-        # Sort by purchase_date descending
-        sorted_txns = sorted(filtered, key=lambda x: x.get('purchase_date', ''), reverse=True)
-        recent_txns = sorted_txns[:limit]
+        # Select the newest by purchase_date without sorting the whole list
+        recent_txns = nlargest(limit, filtered, key=lambda x: x.get('purchase_date', ''))
         result['result'] = {'transactions': recent_txns, 'count': len(recent_txns)}
         result['verification'] = f"✓ Found {len(recent_txns)} most recent transactions"
         result['recent_transactions'] = recent_txns
@@ -2879,7 +3858,7 @@ def execute_structured_query(classification: dict, all_transactions: list) -> di
 def _matches_month_year(date_str: str, month: int, year: int) -> bool:
     """Check if a date string matches the given month and year."""
     try:
-        date_obj = datetime.strptime(date_str, '%Y-%m-%d')
+        date_obj = _parse_ymd(date_str)
         return date_obj.month == month and date_obj.year == year
     except (ValueError, TypeError):
         return False
@@ -2906,13 +3885,13 @@ def chat_with_rag():
         # Initialize Gemini model
         model = None
         try:
-            model = genai.GenerativeModel('gemini-2.5-flash')
+            model = get_gemini_model()
         except Exception as e:
-            logger.warning(f'Gemini model initialization failed, trying fallback: {e}')
+            logger.warning('Gemini model initialization failed, trying fallback: %s', e)
             try:
-                model = genai.GenerativeModel('gemini-1.5-flash')
+                model = get_gemini_model('gemini-1.5-flash')
             except Exception as e2:
-                logger.warning(f'Fallback model also failed: {e2}')
+                logger.warning('Fallback model also failed: %s', e2)
         
         if not model:
             return jsonify({
@@ -2929,7 +3908,7 @@ def chat_with_rag():
                 if rag_svc and rag_svc.enabled:
                     context = rag_svc.retrieve_context(user_query)
             except Exception as e:
-                logger.warning(f'RAG service error: {e}')
+                logger.warning('RAG service error: %s', e)
         
         # Get conversation context - prefer message_history from frontend (immediate)
         # Fall back to ChromaDB retrieval (may be delayed)
@@ -2945,7 +3924,7 @@ def chat_with_rag():
                     'timestamp': msg.get('timestamp', ''),
                     'role': msg.get('role', 'user')
                 })
-            logger.info(f"Using {len(message_history)} messages from frontend for context")
+            logger.info("Using %s messages from frontend for context", len(message_history))
         elif RAG_AVAILABLE and conversation_id:
             # Fall back to ChromaDB retrieval
             try:
@@ -2954,7 +3933,7 @@ def chat_with_rag():
                     rag_svc, user_query, conversation_id, n_results=5
                 )
             except Exception as e:
-                logger.warning(f'Conversation context error: {e}')
+                logger.warning('Conversation context error: %s', e)
         
         # Resolve referential queries (they, it, that, there) using conversation context
         resolved_query = user_query
@@ -2966,7 +3945,6 @@ def chat_with_rag():
             recent_texts = [ctx.get('text', '') for ctx in conversation_context.get('current_conversation', [])]
             for text in recent_texts:
                 # Look for merchant/entity names in previous messages
-                import re
                 # Common patterns: "was X for $", "at X", "from X"
                 patterns = [
                     r'was\s+([A-Z][A-Za-z\s\']+?)\s+for\s+\$',  # "was Starbucks Coffee for $"
@@ -2985,7 +3963,7 @@ def chat_with_rag():
                                     resolved_query = re.sub(
                                         rf'\b{word}\b', entity, user_query, flags=re.IGNORECASE
                                     )
-                                    logger.info(f"Resolved '{user_query}' -> '{resolved_query}'")
+                                    logger.info("Resolved '%s' -> '%s'", user_query, resolved_query)
                                     break
                             break
                 if resolved_query != user_query:
@@ -2994,10 +3972,10 @@ def chat_with_rag():
         # Re-fetch RAG context with resolved query if it was modified
         if resolved_query != user_query and RAG_AVAILABLE and rag_svc:
             try:
-                logger.info(f"Re-fetching RAG context for resolved query: {resolved_query}")
+                logger.info("Re-fetching RAG context for resolved query: %s", resolved_query)
                 context = rag_svc.retrieve_context(resolved_query)
             except Exception as e:
-                logger.warning(f'RAG re-fetch error: {e}')
+                logger.warning('RAG re-fetch error: %s', e)
         
         if testing_mode:
             # Generate BOTH responses for comparison
@@ -3008,23 +3986,27 @@ def chat_with_rag():
 USER QUESTION: {user_query}
 
 Provide helpful financial advice."""
+            prompts = [original_prompt]
+            
+            # 2. RAG-enhanced response
+            rag_text = "RAG not available"
+            if rag_svc and rag_svc.enabled and context:
+                prompts.append(rag_svc.build_grounded_prompt(user_query, context))
+            
+            # Both generations run at the same time instead of back to back
+            futures = generate_content_concurrently(model, prompts)
             
             try:
-                original_response = model.generate_content(original_prompt)
-                original_text = original_response.text
+                original_text = futures[0].result().text
             except Exception as e:
-                logger.error(f"Original response generation failed: {e}")
+                logger.error("Original response generation failed: %s", e)
                 original_text = "Failed to generate original response."
             
-            # 2. RAG-enhanced response
-            rag_text = "RAG not available"
-            if rag_svc and rag_svc.enabled and context:
-                rag_prompt = rag_svc.build_grounded_prompt(user_query, context)
+            if len(futures) > 1:
                 try:
-                    rag_response = model.generate_content(rag_prompt)
-                    rag_text = rag_response.text
+                    rag_text = futures[1].result().text
                 except Exception as e:
-                    logger.error(f"RAG response generation failed: {e}")
+                    logger.error("RAG response generation failed: %s", e)
                     rag_text = "Failed to generate RAG response."
             
             # Format context for display
@@ -3059,10 +4041,9 @@ Provide helpful financial advice."""
             
             # Single unified LLM call for all classification (structured intent + filters + context needs)
             classification = classify_financial_query(user_query, conv_history_for_llm, use_llm=True)
-            logger.info(f"Unified Classification: intent={classification.get('intent')}, "
-                       f"structured={classification.get('requires_structured')}, "
-                       f"broad_intent={classification.get('broad_intent')}, "
-                       f"llm_classified={classification.get('llm_classified', False)}")
+            logger.info("Unified Classification: intent=%s, structured=%s, broad_intent=%s, llm_classified=%s",
+                        classification.get('intent'), classification.get('requires_structured'),
+                        classification.get('broad_intent'), classification.get('llm_classified', False))
             
             # Extract LLM classification info for response (backward compatible)
             llm_classification = {
@@ -3172,7 +4153,7 @@ Your response:"""
                             'needs_general_knowledge': False
                         })
                     except Exception as e:
-                        logger.error(f"Response generation failed: {e}")
+                        logger.error("Response generation failed: %s", e)
                         return jsonify({
                             'error': 'Failed to generate response',
                             'response': 'I apologize, but I encountered an error. Please try again.'
@@ -3322,7 +4303,7 @@ Provide helpful financial advice."""
                             str(uuid.uuid4()), 'assistant', response.text, timestamp
                         )
                     except Exception as e:
-                        logger.warning(f"Failed to embed conversation: {e}")
+                        logger.warning("Failed to embed conversation: %s", e)
                 
                 return jsonify({
                     'response': response.text,
@@ -3339,14 +4320,14 @@ Provide helpful financial advice."""
                     'entities_detected': llm_classification.get('entities') if llm_classification else None
                 })
             except Exception as e:
-                logger.error(f"Response generation failed: {e}")
+                logger.error("Response generation failed: %s", e)
                 return jsonify({
                     'error': 'Failed to generate response',
                     'response': 'I apologize, but I encountered an error. Please try again.'
                 }), 500
     
     except Exception as e:
-        logger.error(f"Error in chat endpoint: {e}")
+        logger.exception("Error in chat endpoint: %s", e)
         return jsonify({'error': str(e)}), 500
 
 
@@ -3380,7 +4361,7 @@ def embed_transactions_endpoint():
         })
     
     except Exception as e:
-        logger.error(f"Error embedding transactions: {e}")
+        logger.exception("Error embedding transactions: %s", e)
         return jsonify({'error': str(e)}), 500
 
 
@@ -3409,7 +4390,7 @@ def get_rag_stats():
         })
     
     except Exception as e:
-        logger.error(f"Error getting RAG stats: {e}")
+        logger.exception("Error getting RAG stats: %s", e)
         return jsonify({'error': str(e)}), 500
 
 
@@ -3430,41 +4411,11 @@ def sync_transactions_to_rag():
         
         # Get transactions from Plaid
         try:
-            access_token = get_or_create_sandbox_token()
-            
-            cursor = PLAID_TRANSACTION_CURSORS.get('default', '')
-            all_transactions = []
-            has_more = True
-            
-            while has_more:
-                sync_request = TransactionsSyncRequest(
-                    access_token=access_token,
-                    cursor=cursor if cursor else None
-                )
-                sync_response = plaid_client.transactions_sync(sync_request)
-                
-                for trans in sync_response['added']:
-                    all_transactions.append({
-                        'transaction_id': trans['transaction_id'],
-                        'account_id': trans['account_id'],
-                        'date': str(trans['date']),
-                        'name': trans['name'],
-                        'merchant_name': trans.get('merchant_name'),
-                        'amount': trans['amount'],
-                        'category': trans.get('category', []),
-                        'pending': trans['pending']
-                    })
-                
-                cursor = sync_response['next_cursor']
-                has_more = sync_response['has_more']
-                
-                if len(all_transactions) > 500:
-                    break
-            
-            PLAID_TRANSACTION_CURSORS['default'] = cursor
+            sync_plaid_transactions_if_stale()
+            all_transactions = load_plaid_transactions()
             
         except Exception as e:
-            logger.warning(f"Plaid sync failed, using mock data: {e}")
+            logger.warning("Plaid sync failed, using mock data: %s", e)
             # Use mock transactions
             all_transactions = generate_realistic_transactions(30, [])
         
@@ -3488,7 +4439,7 @@ def sync_transactions_to_rag():
         })
     
     except Exception as e:
-        logger.error(f"Error syncing transactions to RAG: {e}")
+        logger.exception("Error syncing transactions to RAG: %s", e)
         return jsonify({'error': str(e)}), 500
 
 
@@ -3541,7 +4492,7 @@ def initialize_rag_data():
         
         # Check if we have cached transactions from generate_realistic_transactions
         if CACHED_TRANSACTIONS['data'] is not None and len(CACHED_TRANSACTIONS['data']) > 0:
-            logger.info(f"Using {len(CACHED_TRANSACTIONS['data'])} cached transactions for RAG")
+            logger.info("Using %s cached transactions for RAG", len(CACHED_TRANSACTIONS['data']))
             all_transactions = CACHED_TRANSACTIONS['data']
         else:
             # No cache yet - trigger generation which will cache
@@ -3593,7 +4544,7 @@ def initialize_rag_data():
         elapsed = time.time() - start_time
         final_stats = rag_svc.get_collection_stats()
         
-        logger.info(f"RAG initialized: {embedded_count} transactions, {patterns_count} patterns in {elapsed:.2f}s")
+        logger.info("RAG initialized: %s transactions, %s patterns in %.2fs", embedded_count, patterns_count, elapsed)
         
         return jsonify({
             'success': True,
@@ -3607,7 +4558,7 @@ def initialize_rag_data():
         })
     
     except Exception as e:
-        logger.error(f"Error initializing RAG data: {e}")
+        logger.exception("Error initializing RAG data: %s", e)
         return jsonify({
             'success': False,
             'error': str(e),
@@ -3626,20 +4577,22 @@ def create_conversation():
         user_id = data.get('user_id', 'default_user')
         title = data.get('title', 'New Conversation')
         
-        conn = sqlite3.connect(DB_PATH)
+        conn = get_db_connection()
         cursor = conn.cursor()
         
+        now = datetime.now().isoformat()
         cursor.execute('''
             INSERT OR REPLACE INTO conversations 
-            (id, user_id, created_at, updated_at, title, message_count)
-            VALUES (?, ?, ?, ?, ?, ?)
+            (id, user_id, created_at, updated_at, title, message_count, last_msg_at)
+            VALUES (?, ?, ?, ?, ?, ?, ?)
         ''', (
             conversation_id,
             user_id,
-            datetime.now().isoformat(),
-            datetime.now().isoformat(),
+            now,
+            now,
             title,
-            0
+            0,
+            now
         ))
         
         conn.commit()
@@ -3650,7 +4603,7 @@ def create_conversation():
             'status': 'created'
         })
     except Exception as e:
-        logger.error(f"Error creating conversation: {e}")
+        logger.exception("Error creating conversation: %s", e)
         return jsonify({'error': str(e)}), 500
 
 
@@ -3660,14 +4613,14 @@ def get_conversations():
     try:
         user_id = request.args.get('user_id', 'default_user')
         
-        conn = sqlite3.connect(DB_PATH)
+        conn = get_db_connection()
         cursor = conn.cursor()
         
         cursor.execute('''
-            SELECT id, title, created_at, updated_at, message_count
+            SELECT id, title, created_at, updated_at, message_count, last_msg_preview
             FROM conversations
             WHERE user_id = ?
-            ORDER BY updated_at DESC
+            ORDER BY last_msg_at DESC
             LIMIT 50
         ''', (user_id,))
         
@@ -3678,14 +4631,15 @@ def get_conversations():
                 'title': row[1],
                 'created_at': row[2],
                 'updated_at': row[3],
-                'message_count': row[4]
+                'message_count': row[4],
+                'last_message_preview': row[5]
             })
         
         conn.close()
         
         return jsonify({'conversations': conversations})
     except Exception as e:
-        logger.error(f"Error getting conversations: {e}")
+        logger.exception("Error getting conversations: %s", e)
         return jsonify({'error': str(e)}), 500
 
 
@@ -3693,7 +4647,7 @@ def get_conversations():
 def get_conversation_messages(conversation_id):
     """Get all messages in a conversation"""
     try:
-        conn = sqlite3.connect(DB_PATH)
+        conn = get_db_connection()
         cursor = conn.cursor()
         
         cursor.execute('''
@@ -3710,64 +4664,68 @@ def get_conversation_messages(conversation_id):
                 'role': row[1],
                 'content': row[2],
                 'timestamp': row[3],
-                'metadata': json.loads(row[4]) if row[4] else {}
+                'metadata': app.json.loads(row[4]) if row[4] else {}
             })
         
         conn.close()
         
         return jsonify({'messages': messages})
     except Exception as e:
-        logger.error(f"Error getting messages: {e}")
+        logger.exception("Error getting messages: %s", e)
         return jsonify({'error': str(e)}), 500
 
 
-@app.route('/api/conversations/<conversation_id>/messages', methods=['POST'])
-def save_message(conversation_id):
-    """Save a message to a conversation"""
-    try:
-        data = request.get_json()
-        message_id = str(uuid.uuid4())
-        
-        conn = sqlite3.connect(DB_PATH)
-        cursor = conn.cursor()
-        
+def save_messages(conversation_id, rows):
+    """Insert (id, conversation_id, role, content, timestamp, metadata) rows in one transaction"""
+    now = datetime.now().isoformat()
+    conn = get_db_connection()
+    with conn:
         # Ensure conversation exists
-        cursor.execute('''
+        conn.execute('''
             INSERT OR IGNORE INTO conversations 
-            (id, created_at, updated_at, title, message_count)
-            VALUES (?, ?, ?, ?, 0)
-        ''', (conversation_id, datetime.now().isoformat(), datetime.now().isoformat(), 'New Conversation'))
+            (id, created_at, updated_at, title, message_count, last_msg_at)
+            VALUES (?, ?, ?, ?, 0, ?)
+        ''', (conversation_id, now, now, 'New Conversation', now))
         
-        # Save message
-        cursor.execute('''
+        # trg_msg_touch updates the conversation's count and timestamps
+        conn.executemany('''
             INSERT INTO messages 
             (id, conversation_id, role, content, timestamp, metadata)
             VALUES (?, ?, ?, ?, ?, ?)
-        ''', (
-            message_id,
-            conversation_id,
-            data['role'],
-            data['content'],
-            datetime.now().isoformat(),
-            json.dumps(data.get('metadata', {}))
-        ))
+        ''', rows)
+    conn.close()
+
+@app.route('/api/conversations/<conversation_id>/messages', methods=['POST'])
+def save_message(conversation_id):
+    """Save a message, or a whole turn as {"messages": [...]}, to a conversation"""
+    try:
+        data = request.get_json()
+        messages = data.get('messages') or [data]
         
-        # Update conversation
-        cursor.execute('''
-            UPDATE conversations 
-            SET updated_at = ?, message_count = message_count + 1
-            WHERE id = ?
-        ''', (datetime.now().isoformat(), conversation_id))
+        # Offset each row by a microsecond so a turn keeps its order when sorted by timestamp
+        base_time = datetime.now()
+        rows = [(
+            str(uuid.uuid4()),
+            conversation_id,
+            message['role'],
+            message['content'],
+            (base_time + timedelta(microseconds=i)).isoformat(),
+            app.json.dumps(message.get('metadata', {}))
+        ) for i, message in enumerate(messages)]
         
-        conn.commit()
-        conn.close()
+        save_messages(conversation_id, rows)
         
+        if 'messages' in data:
+            return jsonify({
+                'message_ids': [row[0] for row in rows],
+                'status': 'saved'
+            })
         return jsonify({
-            'message_id': message_id,
+            'message_id': rows[0][0],
             'status': 'saved'
         })
     except Exception as e:
-        logger.error(f"Error saving message: {e}")
+        logger.exception("Error saving message: %s", e)
         return jsonify({'error': str(e)}), 500
 
 
@@ -3776,7 +4734,7 @@ def delete_conversation(conversation_id):
     """Delete a conversation and its messages from SQLite and ChromaDB"""
     try:
         # Delete from SQLite
-        conn = sqlite3.connect(DB_PATH)
+        conn = get_db_connection()
         cursor = conn.cursor()
         
         # Delete messages first (foreign key)
@@ -3803,11 +4761,11 @@ def delete_conversation(conversation_id):
                     results = collection.get(where={'conversation_id': conversation_id})
                     if results['ids']:
                         collection.delete(ids=results['ids'])
-                        logger.info(f"Deleted {len(results['ids'])} embeddings from ChromaDB")
+                        logger.info("Deleted %s embeddings from ChromaDB", len(results['ids']))
             except Exception as e:
-                logger.warning(f"ChromaDB cleanup failed: {e}")
+                logger.warning("ChromaDB cleanup failed: %s", e)
         
-        logger.info(f"Deleted conversation {conversation_id} with {msg_count} messages")
+        logger.info("Deleted conversation %s with %s messages", conversation_id, msg_count)
         
         return jsonify({
             'status': 'deleted',
@@ -3815,7 +4773,7 @@ def delete_conversation(conversation_id):
             'messages_deleted': msg_count
         })
     except Exception as e:
-        logger.error(f"Error deleting conversation: {e}")
+        logger.exception("Error deleting conversation: %s", e)
         return jsonify({'error': str(e)}), 500
 
 
@@ -3838,7 +4796,7 @@ def get_user_profile():
         profile = profile_svc.get_profile(user_id)
         return jsonify(profile)
     except Exception as e:
-        logger.error(f"Error getting profile: {e}")
+        logger.exception("Error getting profile: %s", e)
         return jsonify({'error': str(e)}), 500
 
 
@@ -3860,7 +4818,7 @@ def update_user_profile():
             return jsonify({'status': 'updated'})
         return jsonify({'error': 'Update failed'}), 500
     except Exception as e:
-        logger.error(f"Error updating profile: {e}")
+        logger.exception("Error updating profile: %s", e)
         return jsonify({'error': str(e)}), 500
 
 
@@ -3882,7 +4840,7 @@ def update_demographics():
             return jsonify({'status': 'updated'})
         return jsonify({'error': 'Update failed'}), 500
     except Exception as e:
-        logger.error(f"Error updating demographics: {e}")
+        logger.exception("Error updating demographics: %s", e)
         return jsonify({'error': str(e)}), 500
 
 
@@ -3904,7 +4862,7 @@ def update_financials():
             return jsonify({'status': 'updated'})
         return jsonify({'error': 'Update failed'}), 500
     except Exception as e:
-        logger.error(f"Error updating financials: {e}")
+        logger.exception("Error updating financials: %s", e)
         return jsonify({'error': str(e)}), 500
 
 
@@ -3926,7 +4884,7 @@ def update_preferences():
             return jsonify({'status': 'updated'})
         return jsonify({'error': 'Update failed'}), 500
     except Exception as e:
-        logger.error(f"Error updating preferences: {e}")
+        logger.exception("Error updating preferences: %s", e)
         return jsonify({'error': str(e)}), 500
 
 
@@ -3948,7 +4906,7 @@ def complete_onboarding():
             return jsonify({'status': 'onboarding_complete'})
         return jsonify({'error': 'Onboarding failed'}), 500
     except Exception as e:
-        logger.error(f"Error completing onboarding: {e}")
+        logger.exception("Error completing onboarding: %s", e)
         return jsonify({'error': str(e)}), 500
 
 
@@ -3974,7 +4932,7 @@ def get_user_behaviors():
         
         return jsonify(behaviors)
     except Exception as e:
-        logger.error(f"Error getting behaviors: {e}")
+        logger.exception("Error getting behaviors: %s", e)
         return jsonify({'error': str(e)}), 500
 
 
@@ -3992,7 +4950,7 @@ def get_personalization_context():
         context = profile_svc.get_personalization_context(user_id)
         return jsonify({'context': context})
     except Exception as e:
-        logger.error(f"Error getting context: {e}")
+        logger.exception("Error getting context: %s", e)
         return jsonify({'error': str(e)}), 500
 
 
@@ -4095,7 +5053,7 @@ FINANCIAL_TOOLS = [
 
 def execute_agentic_tool(tool_name: str, args: dict) -> dict:
     """Execute a tool and return the result."""
-    logger.info(f"Executing tool: {tool_name} with args: {args}")
+    logger.info("Executing tool: %s with args: %s", tool_name, args)
     
     today = datetime.now()
     
@@ -4133,7 +5091,7 @@ def execute_agentic_tool(tool_name: str, args: dict) -> dict:
         
         # Apply limit (convert to int since Gemini returns floats)
         limit = int(args.get("limit", 20))
-        filtered = sorted(filtered, key=lambda x: x.get('purchase_date', ''), reverse=True)[:limit]
+        filtered = nlargest(limit, filtered, key=lambda x: x.get('purchase_date', ''))
         
         return {
             "transactions": [
@@ -4320,7 +5278,7 @@ def execute_agentic_tool(tool_name: str, args: dict) -> dict:
                         "message": "No matching transactions found"
                     }
             except Exception as e:
-                logger.warning(f"RAG search failed: {e}")
+                logger.warning("RAG search failed: %s", e)
                 return {"error": f"RAG search failed: {str(e)}"}
         else:
             return {"error": "RAG service not available"}
@@ -4398,7 +5356,7 @@ PERSONALIZATION GUIDELINES:
                 # Increment chat count
                 profile_svc.increment_chat_count(user_id)
             except Exception as e:
-                logger.warning(f"Failed to get profile context: {e}")
+                logger.warning("Failed to get profile context: %s", e)
         
         # Initialize model with tools and personalized prompt
         model = genai.GenerativeModel(
@@ -4451,7 +5409,7 @@ PERSONALIZATION GUIDELINES:
                     fn_name = fn_call.name
                     fn_args = dict(fn_call.args) if fn_call.args else {}
                     
-                    logger.info(f"Agentic tool call: {fn_name}({fn_args})")
+                    logger.info("Agentic tool call: %s(%s)", fn_name, fn_args)
                     
                     # Execute the tool
                     result = execute_agentic_tool(fn_name, fn_args)
@@ -4466,7 +5424,7 @@ PERSONALIZATION GUIDELINES:
                         genai.protos.Part(
                             function_response=genai.protos.FunctionResponse(
                                 name=fn_name,
-                                response={"result": json.dumps(result)}
+                                response={"result": app.json.dumps(result)}
                             )
                         )
                     )
@@ -4503,9 +5461,9 @@ PERSONALIZATION GUIDELINES:
                     rag_svc, conversation_id,
                     str(uuid.uuid4()), 'assistant', final_response, timestamp
                 )
-                logger.info(f"Embedded conversation turn to ChromaDB for {conversation_id}")
+                logger.info("Embedded conversation turn to ChromaDB for %s", conversation_id)
             except Exception as e:
-                logger.warning(f"Failed to embed conversation: {e}")
+                logger.warning("Failed to embed conversation: %s", e)
         
         return jsonify({
             'response': final_response,
@@ -4515,9 +5473,7 @@ PERSONALIZATION GUIDELINES:
         })
         
     except Exception as e:
-        logger.error(f"Agentic chat error: {e}")
-        import traceback
-        traceback.print_exc()
+        logger.exception("Agentic chat error: %s", e)
         return jsonify({
             'error': str(e),
             'response': 'I encountered an error processing your request.'
@@ -0,0 +1,20 @@
+"""Gunicorn settings for serving the backend: gunicorn app:app"""
+
+import os
+
+bind = os.getenv('BIND', '0.0.0.0:5001')
+workers = int(os.getenv('WEB_CONCURRENCY', '4'))
+
+# Threaded workers rather than gevent: the Gemini SDK talks gRPC, which does not
+# cooperate with gevent's monkey-patching, and the views block on network I/O
+# (Gemini, Plaid) where threads release the GIL.
+worker_class = 'gthread'
+threads = int(os.getenv('GUNICORN_THREADS', '25'))
+timeout = 120
+keepalive = 5
+
+
+def post_fork(server, worker):
+    # gRPC channels must not be shared across fork, so give each worker its own client
+    import google.generativeai as genai
+    genai.configure(api_key=os.getenv('GEMINI_API_KEY'), transport=os.getenv('GEMINI_TRANSPORT', 'grpc'))
@@ -11,6 +11,8 @@ Uses:
 
 import os
 import logging
+import threading
+from functools import lru_cache
 from datetime import datetime, timedelta
 from typing import List, Dict, Any, Optional
 import json
@@ -25,6 +27,7 @@ except ImportError:
     logging.warning("ChromaDB not available. RAG features will be disabled.")
 
 try:
+    import numpy as np
     from sentence_transformers import SentenceTransformer
     SENTENCE_TRANSFORMERS_AVAILABLE = True
 except ImportError:
@@ -36,6 +39,9 @@ logger = logging.getLogger(__name__)
 # Constants
 CHROMA_DB_PATH = os.path.join(os.path.dirname(__file__), "chroma_db")
 EMBEDDING_MODEL = "all-MiniLM-L6-v2"
+# "onnx" runs the encoder through ONNX Runtime (needs sentence-transformers[onnx])
+EMBEDDING_BACKEND = os.getenv("EMBEDDING_BACKEND", "torch")
+EMBEDDING_ONNX_THREADS = int(os.getenv("EMBEDDING_ONNX_THREADS", "2"))
 
 # Collection names
 TRANSACTIONS_COLLECTION = "transactions"
@@ -47,6 +53,13 @@ CONVERSATION_MEMORY_COLLECTION = "conversation_memory"
 _temporal_cache = {}
 
 
+@lru_cache(maxsize=None)
+def _get_gemini_model(model_name: str = 'gemini-2.5-flash'):
+    """Return a shared Gemini model for classification calls, created on first use."""
+    import google.generativeai as genai
+    return genai.GenerativeModel(model_name)
+
+
 # ========== LLM-Enhanced Temporal Parsing ==========
 
 def needs_llm_temporal_parsing(query_lower: str) -> bool:
@@ -83,8 +96,6 @@ def extract_temporal_with_llm(query: str, current_dt: datetime) -> Optional[Dict
     Returns:
         Dict with temporal filter or None if no temporal reference
     """
-    import google.generativeai as genai
-    
     # Check cache first
     cache_key = f"{query.lower().strip()}_{current_dt.strftime('%Y-%m-%d')}"
     if cache_key in _temporal_cache:
@@ -116,7 +127,7 @@ If no temporal reference found:
 JSON response:"""
 
     try:
-        model = genai.GenerativeModel('gemini-2.5-flash')
+        model = _get_gemini_model()
         response = model.generate_content(prompt)
         response_text = response.text.strip()
         
@@ -350,7 +361,6 @@ def classify_query_unified_llm(query: str, conversation_history: Optional[List[D
             'entities': {...}
         }
     """
-    import google.generativeai as genai
     from datetime import datetime
     
     today = datetime.now()
@@ -411,7 +421,7 @@ BROAD INTENT:
 JSON response:"""
 
     try:
-        model = genai.GenerativeModel('gemini-2.5-flash')
+        model = _get_gemini_model()
         response = model.generate_content(
             classification_prompt,
             generation_config={
@@ -871,6 +881,25 @@ class RAGService:
         if self.enabled:
             self._initialize()
     
+    def _load_embedding_model(self):
+        """Load the sentence encoder, on ONNX Runtime when EMBEDDING_BACKEND is "onnx"."""
+        if EMBEDDING_BACKEND != "onnx":
+            return SentenceTransformer(EMBEDDING_MODEL)
+        
+        try:
+            import onnxruntime as ort
+            options = ort.SessionOptions()
+            options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+            options.intra_op_num_threads = EMBEDDING_ONNX_THREADS
+            return SentenceTransformer(
+                EMBEDDING_MODEL,
+                backend="onnx",
+                model_kwargs={"provider": "CPUExecutionProvider", "session_options": options}
+            )
+        except Exception as e:
+            logger.warning(f"ONNX embedding backend unavailable, using torch: {e}")
+            return SentenceTransformer(EMBEDDING_MODEL)
+    
     def _initialize(self):
         """Initialize ChromaDB and embedding model."""
         try:
@@ -879,8 +908,8 @@ class RAGService:
             self.client = chromadb.PersistentClient(path=CHROMA_DB_PATH)
             
             # Load embedding model
-            logger.info(f"Loading embedding model: {EMBEDDING_MODEL}")
-            self.embedding_model = SentenceTransformer(EMBEDDING_MODEL)
+            logger.info(f"Loading embedding model: {EMBEDDING_MODEL} ({EMBEDDING_BACKEND})")
+            self.embedding_model = self._load_embedding_model()
             
             # Initialize collections
             self.collections[TRANSACTIONS_COLLECTION] = self.client.get_or_create_collection(
@@ -1435,8 +1464,6 @@ def classify_query_intent_with_llm(query, conversation_history=None):
             'entities': dict  # merchants, categories, time periods mentioned
         }
     """
-    import google.generativeai as genai
-    
     # Build conversation context if available
     context_str = ""
     if conversation_history:
@@ -1495,7 +1522,7 @@ Now analyze the user's query above."""
 
     try:
         # Call Gemini for classification
-        model = genai.GenerativeModel('gemini-2.5-flash')
+        model = _get_gemini_model()
         response = model.generate_content(
             classification_prompt,
             generation_config={
@@ -1531,6 +1558,66 @@ Now analyze the user's query above."""
         }
 
 
+# ========== Semantic Response Cache ==========
+
+class SemanticCache:
+    """
+    In-process cache of LLM responses matched by embedding similarity.
+    
+    Entries live in separate namespaces (e.g. one per advisor) so a hit can
+    only come from the same kind of prompt. Embeddings come from the RAG
+    service's model and are normalized, so a dot product is the cosine score.
+    """
+    
+    def __init__(self, rag_service, threshold: float = 0.92, max_entries: int = 1000):
+        self.rag_service = rag_service
+        self.threshold = threshold
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        self._namespaces = {}  # namespace -> {'vectors': [...], 'responses': [...]}
+        # A miss embeds the text in get() and again in put(); repeats skip the encoder
+        self._embed = lru_cache(maxsize=1024)(self._encode)
+    
+    def _encode(self, text: str):
+        """Embed text as a unit vector, or None if embeddings are unavailable."""
+        if not self.rag_service.enabled or not self.rag_service.embedding_model:
+            return None
+        return self.rag_service.embedding_model.encode(text, normalize_embeddings=True)
+    
+    def get(self, namespace: str, text: str) -> Optional[str]:
+        """Return the cached response for the most similar text above the threshold."""
+        with self._lock:
+            entries = self._namespaces.get(namespace)
+            if not entries or not entries['vectors']:
+                return None
+            vectors = entries['vectors'][:]
+            responses = entries['responses'][:]
+        
+        vector = self._embed(text)
+        if vector is None:
+            return None
+        
+        scores = np.stack(vectors) @ vector
+        best = int(np.argmax(scores))
+        if scores[best] >= self.threshold:
+            return responses[best]
+        return None
+    
+    def put(self, namespace: str, text: str, response: str) -> None:
+        """Cache a response, evicting the oldest entries past max_entries."""
+        vector = self._embed(text)
+        if vector is None:
+            return
+        
+        with self._lock:
+            entries = self._namespaces.setdefault(namespace, {'vectors': [], 'responses': []})
+            entries['vectors'].append(vector)
+            entries['responses'].append(response)
+            if len(entries['vectors']) > self.max_entries:
+                del entries['vectors'][0]
+                del entries['responses'][0]
+
+
 # Global RAG service instance
 rag_service = None
 
@@ -10,7 +10,7 @@ load_dotenv()
 class StockAdvisor:
     def __init__(self):
         # Configure API key 
-        genai.configure(api_key=os.getenv('GEMINI_API_KEY'))
+        genai.configure(api_key=os.getenv('GEMINI_API_KEY'), transport=os.getenv('GEMINI_TRANSPORT', 'grpc'))
         self.model = genai.GenerativeModel('gemini-2.5-flash')
         self.advisors = {
             'warren_buffett': {
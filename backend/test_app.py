@@ -0,0 +1,253 @@
+import queue
+import re
+import threading
+import time
+from collections import OrderedDict
+
+import app as backend_app
+from app import strip_code_fence
+
+
+def test_strip_code_fence_removes_json_fence():
+    assert strip_code_fence('```json\n{"a": 1}\n```') == '{"a": 1}'
+
+
+def test_strip_code_fence_handles_unclosed_fence():
+    assert strip_code_fence('```\n{"a": 1}') == '{"a": 1}'
+
+
+def test_strip_code_fence_keeps_backticks_in_unfenced_json():
+    assert strip_code_fence('{"code":"```"}') == '{"code":"```"}'
+    assert strip_code_fence('{"a": "x```y"}') == '{"a": "x```y"}'
+
+
+def test_strip_code_fence_keeps_backticks_inside_fence():
+    assert strip_code_fence('```json\n{"code": "```"}\n```') == '{"code": "```"}'
+
+
+# ========== Background categorizer ==========
+
+def _fresh_categorizer(monkeypatch, cache_max=10000):
+    """Give the categorizer empty state and a placeholder worker so no thread starts"""
+    monkeypatch.setattr(backend_app, '_CATEGORIZE_QUEUE', queue.Queue())
+    monkeypatch.setattr(backend_app, '_CATEGORIZE_PENDING', set())
+    monkeypatch.setattr(backend_app, '_CATEGORIZE_FAILED', {})
+    monkeypatch.setattr(backend_app, 'CATEGORY_CACHE', OrderedDict())
+    monkeypatch.setattr(backend_app, 'CATEGORY_CACHE_MAX', cache_max)
+    monkeypatch.setattr(backend_app, '_categorizer', object())
+
+
+def _drain_categorize_queue():
+    batch = []
+    while not backend_app._CATEGORIZE_QUEUE.empty():
+        batch.append(backend_app._CATEGORIZE_QUEUE.get_nowait())
+    return batch
+
+
+def _transaction(i, description=None):
+    return {'_id': f'trans_{i}', 'description': description or f'Merchant {i}', 'amount': -10.0 - i}
+
+
+def test_queue_categorization_queues_a_key_once_while_pending(monkeypatch):
+    _fresh_categorizer(monkeypatch)
+    
+    backend_app.queue_categorization([_transaction(1)])
+    backend_app.queue_categorization([_transaction(1)])
+    # A different id with the same description and rounded amount shares the key
+    backend_app.queue_categorization([{**_transaction(1), '_id': 'other'}])
+    
+    assert backend_app._CATEGORIZE_QUEUE.qsize() == 1
+
+
+def test_failed_key_is_not_requeued_until_retry_time(monkeypatch):
+    _fresh_categorizer(monkeypatch)
+    monkeypatch.setattr(backend_app, 'categorize_transactions', lambda transactions: {'categorized_transactions': []})
+    transaction = _transaction(1)
+    key = backend_app._category_cache_key(transaction)
+    
+    backend_app.queue_categorization([transaction])
+    backend_app._run_categorize_batch(_drain_categorize_queue())
+    
+    assert key not in backend_app.CATEGORY_CACHE
+    assert key not in backend_app._CATEGORIZE_PENDING
+    assert backend_app._CATEGORIZE_FAILED[key] > time.time() + backend_app.CATEGORIZE_RETRY_AFTER - 5
+    
+    backend_app.queue_categorization([transaction])
+    assert backend_app._CATEGORIZE_QUEUE.qsize() == 0
+    
+    # Once the retry time has passed the key is queued again
+    backend_app._CATEGORIZE_FAILED[key] = time.time() - 1
+    backend_app.queue_categorization([transaction])
+    assert backend_app._CATEGORIZE_QUEUE.qsize() == 1
+    assert key not in backend_app._CATEGORIZE_FAILED
+
+
+def test_batch_exception_backs_off_every_key(monkeypatch):
+    _fresh_categorizer(monkeypatch)
+    
+    def fail(transactions):
+        raise RuntimeError('model down')
+    monkeypatch.setattr(backend_app, 'categorize_transactions', fail)
+    
+    backend_app.queue_categorization([_transaction(i) for i in range(3)])
+    backend_app._run_categorize_batch(_drain_categorize_queue())
+    
+    assert len(backend_app._CATEGORIZE_FAILED) == 3
+    assert not backend_app._CATEGORIZE_PENDING
+
+
+def test_categorizer_state_stays_within_cache_max(monkeypatch):
+    _fresh_categorizer(monkeypatch, cache_max=3)
+    
+    # Even ids are categorized, odd ids are missing from the reply
+    def categorize(transactions):
+        return {'categorized_transactions': [
+            {'_id': t['_id'], 'category': 'Shopping'}
+            for t in transactions if int(t['_id'].split('_')[1]) % 2 == 0
+        ]}
+    monkeypatch.setattr(backend_app, 'categorize_transactions', categorize)
+    
+    backend_app.queue_categorization([_transaction(i) for i in range(12)])
+    backend_app._run_categorize_batch(_drain_categorize_queue())
+    
+    assert len(backend_app.CATEGORY_CACHE) == 3
+    assert len(backend_app._CATEGORIZE_FAILED) == 3
+    # The newest entries are the ones kept
+    assert backend_app._category_cache_key(_transaction(10)) in backend_app.CATEGORY_CACHE
+    assert backend_app._category_cache_key(_transaction(11)) in backend_app._CATEGORIZE_FAILED
+
+
+# ========== Insight batcher ==========
+
+class _FakeResponse:
+    def __init__(self, text):
+        self.text = text
+
+
+class _FakeModel:
+    def __init__(self, reply=None, error=None):
+        self.reply = reply
+        self.error = error
+        self.prompts = []
+    
+    def generate_content(self, prompt, **kwargs):
+        self.prompts.append(prompt)
+        if self.error is not None:
+            raise self.error
+        return _FakeResponse(self.reply(prompt) if callable(self.reply) else self.reply)
+
+
+def test_insight_batch_routes_results_by_index(monkeypatch):
+    # Reply out of order and without index 1
+    reply = '[{"index": 2, "insight": "c", "advice": "z"}, {"index": 0, "insight": "a", "advice": "x"}]'
+    monkeypatch.setattr(backend_app, 'get_gemini_model', lambda: _FakeModel(reply))
+    batch = [({'description': name}, backend_app.Future()) for name in ('A', 'B', 'C')]
+    
+    backend_app._run_insight_batch(batch)
+    
+    assert batch[0][1].result(timeout=0) == {'insight': 'a', 'advice': 'x'}
+    assert batch[2][1].result(timeout=0) == {'insight': 'c', 'advice': 'z'}
+    assert isinstance(batch[1][1].exception(timeout=0), ValueError)
+
+
+def test_insight_batch_model_error_fails_every_future(monkeypatch):
+    error = RuntimeError('quota exceeded')
+    monkeypatch.setattr(backend_app, 'get_gemini_model', lambda: _FakeModel(error=error))
+    batch = [({'description': name}, backend_app.Future()) for name in ('A', 'B')]
+    
+    backend_app._run_insight_batch(batch)
+    
+    # Every waiter is released at once instead of sitting out INSIGHT_BATCH_TIMEOUT
+    for _, future in batch:
+        assert future.exception(timeout=0) is error
+
+
+def test_submit_transaction_insight_resolves_through_batcher(monkeypatch):
+    def reply(prompt):
+        count = len(re.findall(r'^\d+\. ', prompt, re.MULTILINE))
+        return '[' + ', '.join(
+            f'{{"index": {i}, "insight": "i{i}", "advice": "a{i}"}}' for i in range(count)
+        ) + ']'
+    model = _FakeModel(reply)
+    monkeypatch.setattr(backend_app, 'get_gemini_model', lambda: model)
+    
+    futures = [backend_app.submit_transaction_insight({'description': f'T{i}'}) for i in range(3)]
+    results = [future.result(timeout=5) for future in futures]
+    
+    assert sorted(result['insight'] for result in results) == ['i0', 'i1', 'i2']
+
+
+# ========== Plaid snapshot ==========
+
+def _fresh_plaid_snapshot(monkeypatch):
+    monkeypatch.setattr(backend_app, '_PLAID_SNAPSHOT', {
+        'ts': 0.0, 'token': None, 'cursor': '', 'accounts': [], 'transactions': {}, 'refresh': None,
+    })
+
+
+def _call_from_threads(count, target):
+    """Run target on count threads released together; return each result or exception"""
+    barrier = threading.Barrier(count)
+    outcomes = [None] * count
+    
+    def run(i):
+        barrier.wait()
+        try:
+            outcomes[i] = target()
+        except Exception as e:
+            outcomes[i] = e
+    
+    threads = [threading.Thread(target=run, args=(i,)) for i in range(count)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join(timeout=5)
+    return outcomes
+
+
+def _slow_snapshot_fetch(calls, error=None):
+    def fetch():
+        calls.append(threading.get_ident())
+        # Long enough for every other caller to find the refresh in flight
+        time.sleep(0.2)
+        if error is not None:
+            raise error
+        accounts = [{'id': 'acc_1'}]
+        transactions = {'txn_1': {'transaction_id': 'txn_1', 'amount': 12.5}}
+        with backend_app._PLAID_SNAPSHOT_LOCK:
+            backend_app._PLAID_SNAPSHOT.update(accounts=accounts, transactions=transactions, ts=time.time())
+        return accounts, transactions
+    return fetch
+
+
+def test_concurrent_snapshot_callers_share_one_fetch(monkeypatch):
+    _fresh_plaid_snapshot(monkeypatch)
+    calls = []
+    monkeypatch.setattr(backend_app, '_refresh_plaid_snapshot', _slow_snapshot_fetch(calls))
+    
+    outcomes = _call_from_threads(8, backend_app._get_plaid_snapshot)
+    
+    assert len(calls) == 1
+    assert all(outcome == ([{'id': 'acc_1'}], [{'transaction_id': 'txn_1', 'amount': 12.5}]) for outcome in outcomes)
+    assert backend_app._PLAID_SNAPSHOT['refresh'] is None
+
+
+def test_snapshot_fetch_error_reaches_every_waiter_then_clears(monkeypatch):
+    _fresh_plaid_snapshot(monkeypatch)
+    error = RuntimeError('plaid unavailable')
+    calls = []
+    monkeypatch.setattr(backend_app, '_refresh_plaid_snapshot', _slow_snapshot_fetch(calls, error=error))
+    
+    outcomes = _call_from_threads(8, backend_app._get_plaid_snapshot)
+    
+    assert len(calls) == 1
+    assert all(outcome is error for outcome in outcomes)
+    assert backend_app._PLAID_SNAPSHOT['refresh'] is None
+    
+    # The failed refresh is not cached, so the next caller fetches again
+    monkeypatch.setattr(backend_app, '_refresh_plaid_snapshot', _slow_snapshot_fetch(calls))
+    accounts, transactions = backend_app._get_plaid_snapshot()
+    
+    assert len(calls) == 2
+    assert accounts == [{'id': 'acc_1'}]
+    assert transactions == [{'transaction_id': 'txn_1', 'amount': 12.5}]
@@ -16,6 +16,15 @@ logger = logging.getLogger(__name__)
 
 DB_PATH = os.path.join(os.path.dirname(__file__), 'secretary.db')
 
+# Per-connection settings shared with app.get_db_connection();
+# journal_mode=WAL is stored in the database file itself
+SQLITE_PRAGMAS = (
+    'PRAGMA synchronous=NORMAL',
+    'PRAGMA cache_size=-65536',  # 64 MB
+    'PRAGMA temp_store=MEMORY',
+    'PRAGMA mmap_size=268435456',
+)
+
 
 class UserProfileService:
     """Service for managing user profiles and personalization data."""
@@ -24,7 +33,10 @@ class UserProfileService:
         self.db_path = db_path
     
     def _get_connection(self):
-        return sqlite3.connect(self.db_path)
+        conn = sqlite3.connect(self.db_path)
+        for pragma in SQLITE_PRAGMAS:
+            conn.execute(pragma)
+        return conn
     
     # ========== Core Profile Operations ==========
     